@@ -0,0 +1,31 @@
+"""
+Times loading all api files into the model (in this process) and cleaning it up, the work before any file is written.
+Run from the repository root: python -m scripts.benchmarks.bench_clean_up [--api api/] [--rounds 3]
+"""
+import argparse
+import time
+
+from scripts.util.api_store import api_files
+from scripts.util.loading import load_libraries
+from scripts.util.ts_structures import Declaration
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark loading and cleaning up the model")
+    parser.add_argument("--api", default="api/", help="directory with the downloaded api files")
+    parser.add_argument("--rounds", type=int, default=3, help="how often to load everything (default: %(default)s)")
+    args = parser.parse_args()
+
+    libs = api_files(args.api)
+    best_load = best_clean_up = float('inf')
+    for _ in range(args.rounds):
+        decl = Declaration()
+        start = time.perf_counter()
+        load_libraries(decl, libs, 1)
+        loaded = time.perf_counter()
+        decl.clean_up()
+        done = time.perf_counter()
+        best_load = min(best_load, loaded - start)
+        best_clean_up = min(best_clean_up, done - loaded)
+    print("%d libraries  load: %6.3fs  clean up: %6.3fs  total: %6.3fs  (best of %d)" % (
+        len(libs), best_load, best_clean_up, best_load + best_clean_up, args.rounds))
@@ -0,0 +1,112 @@
+"""
+Times rendering the doc comments of all symbols, and compares the result with the previous, multi-pass renderer.
+The single-pass renderer is timed with and without reusing the descriptions that were already marked up.
+Run from the repository root: python -m scripts.benchmarks.bench_comments [--api api/] [--rounds 3]
+"""
+import argparse
+import io
+import re
+import time
+from typing import *
+
+from scripts.util import comment, ts_structures
+from scripts.util.api_store import api_files
+from scripts.util.build_state import load_declaration
+from scripts.util.comment import DESCRIPTIONS, DOCS_URL, Comment
+
+
+# the doc links the multi-pass renderer looked for, one kind in each pass
+CROSS_LINK = re.compile(r"<a[^>]* href=\"#/api/([a-zA-Z0-9.]+)\"[^>]*>([^<>]+)</a>")
+CROSS_LINK_M = re.compile(r"<a[^>]* href=\"#/api/([a-zA-Z0-9.]+)/methods/([a-zA-Z0-9.]+)\"[^>]*>([^<>]+)</a>")
+
+
+def all_comments(decl: ts_structures.Declaration) -> List[Comment]:
+    comments = []
+    for ns in decl.root_ns.walk():
+        blocks = [*ns.classes.values(), *ns.enums.values(), *ns.typedefs.values()]
+        methods = list(ns.methods.values())
+        for clazz in ns.classes.values():
+            methods.extend(clazz.methods.values())
+            if clazz.constructor is not None:
+                methods.append(clazz.constructor)
+        for enum in ns.enums.values():
+            comments.extend(enum.option_comments())
+        comments.extend(block.comment() for block in blocks)
+        comments.extend(method.comment() for method in methods)
+    return [comment for comment in comments if comment is not None]
+
+
+def multi_pass_write(comment: Comment, f: TextIO, indent: str):
+    """how comments were rendered before: one pass for each link kind, then concatenating, splitting and joining"""
+    if comment.text is None or len(comment.text) == 0:
+        return
+    text = comment.text
+    text = CROSS_LINK.sub(lambda m: comment.link(m.group(2), m.group(1)), text)
+    text = CROSS_LINK_M.sub(lambda m: comment.link(m.group(3), m.group(1), m.group(2)), text)
+    if len(comment.parameters) > 0:
+        text += "\n"
+    for (name, description) in comment.parameters:
+        text += "@param " + name + "  " + description + "\n"
+    pretty_text = text.replace('<pre>', '\n<pre>')
+    if comment.uri is not None:
+        pretty_text += '\nOpen <a href="' + DOCS_URL + comment.uri + comment.docs_sub_uri + '">the docs</a>'
+    if comment.has_sample:
+        pretty_text += '\nOpen <a href="https://sapui5.netweaver.ondemand.com/#/entity/' + comment.uri + '">examples</a>'
+    if comment.ux_guide is not None:
+        pretty_text += '\nOpen <a href="' + comment.ux_guide[0] + '">UX Guidelines for "' + comment.ux_guide[1] + '"</a>'
+    if comment.lib is not None and comment.uri is not None:
+        pretty_text += '\nOpen <a href="https://github.com/SAP/openui5/blob/master/src/' + comment.lib + '/src/' + \
+                       comment.uri.replace('.', '/') + '.js'
+        if comment.source_code_line is not None:
+            pretty_text += '#L' + str(comment.source_code_line)
+        pretty_text += '">source code</a>'
+    f.write(indent + "/**\n")
+    f.write('\n'.join([indent + " * " + line for line in pretty_text.split('\n')]) + "\n")
+    f.write(indent + " */\n")
+
+
+class UncachedComment(Comment):
+    """the single-pass renderer on its own, marking up every description again instead of looking it up"""
+
+    def markup(self, text: str) -> str:
+        return self.mark_up_links(text) if '<' in text else text
+
+
+def uncached(comment: Comment) -> Comment:
+    copy = UncachedComment(comment.text)
+    copy.__dict__.update(comment.__dict__)
+    return copy
+
+
+def render_all(comments: List[Comment], write: Callable[[Comment, TextIO, str], None]) -> Tuple[float, str]:
+    DESCRIPTIONS.clear()
+    f = io.StringIO()
+    start = time.perf_counter()
+    for comment in comments:
+        write(comment, f, '        ')
+    return time.perf_counter() - start, f.getvalue()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark rendering all doc comments")
+    parser.add_argument("--api", default="api/", help="directory with the downloaded api files")
+    parser.add_argument("--rounds", type=int, default=3, help="how often to render everything (default: %(default)s)")
+    args = parser.parse_args()
+
+    ts_structures.ENABLE_SOURCE_LINKS_WITH_LINE_NUMBERS = False  # don't go to the network
+    comment.ENABLE_PRETTY_PRINT = False  # the multi-pass renderer did not format the html (see bench_html)
+    decl = load_declaration(api_files(args.api), 1)
+    ts_structures.SYMBOLS = decl.symbols
+    comments = all_comments(decl)
+    print("%d comments, %.1f MB of descriptions" % (len(comments), sum(len(c.text) for c in comments) / 1e6))
+    write = lambda c, f, indent: c.write(f, indent)
+    renderers = [('multi-pass', comments, multi_pass_write), ('single-pass', [uncached(c) for c in comments], write),
+                 ('cached', comments, write)]
+    outputs = {}
+    for name, rendered, write in renderers:
+        seconds = min(render_all(rendered, write)[0] for _ in range(args.rounds))
+        outputs[name] = render_all(rendered, write)[1]
+        print("%-12s %6.3fs  (best of %d)" % (name, seconds, args.rounds))
+    print(DESCRIPTIONS.report())
+    if len(set(outputs.values())) > 1:
+        print("OUTPUT DIFFERS!")
@@ -0,0 +1,64 @@
+"""
+Compares serial and concurrent downloading against the local stand-in server,
+followed by a conditional ("nightly") refresh of the same directory, where only one library changed.
+Run from the repository root: python -m scripts.benchmarks.bench_download
+"""
+import argparse
+import contextlib
+import filecmp
+import io
+import os
+import tempfile
+import time
+
+from scripts import download
+from scripts.benchmarks import fake_ui5_server
+
+
+def run_download(url: str, jobs: int, target: str) -> float:
+    for progress in (download.handled, download.changed, download.unchanged, download.failed):
+        progress.clear()
+    download.configure(jobs, url, target + '/')
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        download.load_entrypoint(jobs)
+    return time.perf_counter() - start
+
+
+def same_files(a: str, b: str) -> bool:
+    names = sorted(os.listdir(a))
+    if names != sorted(os.listdir(b)):
+        return False
+    _, mismatch, errors = filecmp.cmpfiles(a, b, names, shallow=False)
+    return len(mismatch) + len(errors) == 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark download.py against a local fake server")
+    parser.add_argument("--libs", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per request")
+    parser.add_argument("--payload-size", type=int, default=200000)
+    parser.add_argument("--jobs", type=int, nargs='+', default=[1, 4, 8, 16])
+    args = parser.parse_args()
+
+    server = fake_ui5_server.start(0, args.libs, args.latency, args.payload_size)
+    with tempfile.TemporaryDirectory() as tmp:
+        reference = None
+        for jobs in args.jobs:
+            target = os.path.join(tmp, 'jobs' + str(jobs))
+            os.mkdir(target)
+            seconds = run_download(server.url(), jobs, target)
+            identical = reference is None or same_files(reference, target)
+            reference = reference or target
+            print("jobs=%3d  %7.2fs  %6.1f libs/s  %d files%s" % (
+                jobs, seconds, len(download.handled) / seconds, len(os.listdir(target)),
+                '' if identical else '  OUTPUT DIFFERS!'))
+
+        server.change_library('sap.fake0')
+        before = {name: os.stat(os.path.join(reference, name)).st_mtime_ns for name in os.listdir(reference)}
+        seconds = run_download(server.url(), max(args.jobs), reference)
+        written = [name for name in os.listdir(reference)
+                   if before.get(name) != os.stat(os.path.join(reference, name)).st_mtime_ns]
+        print("refresh   %7.2fs  %d changed, %d unchanged (304), files written: %s" % (
+            seconds, len(download.changed), len(download.unchanged), ', '.join(sorted(written))))
+    server.shutdown()
@@ -0,0 +1,69 @@
+"""
+Times formatting the html of all descriptions with the single-pass HtmlPrinter, and with the BeautifulSoup based
+formatter that was used before (and disabled for being too slow). The latter needs `pip install bs4`.
+Run from the repository root: python -m scripts.benchmarks.bench_html [--api api/] [--rounds 3]
+"""
+import argparse
+import re
+import time
+from typing import *
+
+from scripts.util import ts_structures
+from scripts.util.api_store import api_files
+from scripts.util.build_state import load_declaration
+from scripts.util.html_printer import pretty_print_html
+from scripts.benchmarks.bench_comments import all_comments
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
+
+
+LEADING_WHITESPACE = re.compile(r'^(\s*)', re.MULTILINE)
+
+
+def beautiful_soup_print(text: str) -> str:
+    """the previous Comment.pretty_print"""
+    # Double curly brackets to avoid problems with .format()
+    stripped_markup = text.replace('{', '{{').replace('}', '}}')
+
+    soup = BeautifulSoup(stripped_markup, features="html.parser")
+    for img in soup.find_all("img"):
+        img.decompose()
+
+    unformatted_tag_list = []
+
+    for i, tag in enumerate(soup.find_all(['span', 'a', 'code'])):
+        unformatted_tag_list.append(str(tag))
+        tag.replace_with('{' + 'unformatted_tag_list[{0}]'.format(i) + '}')
+
+    pretty = LEADING_WHITESPACE.sub(r'\1' * 4, soup.prettify(formatter="minimal"))
+    return pretty.format(unformatted_tag_list=unformatted_tag_list)
+
+
+def print_all(texts: List[str], pretty_print: Callable[[str], str]) -> float:
+    start = time.perf_counter()
+    for text in texts:
+        pretty_print(text)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark formatting the html of all descriptions")
+    parser.add_argument("--api", default="api/", help="directory with the downloaded api files")
+    parser.add_argument("--rounds", type=int, default=3, help="how often to format everything (default: %(default)s)")
+    args = parser.parse_args()
+
+    ts_structures.ENABLE_SOURCE_LINKS_WITH_LINE_NUMBERS = False  # don't go to the network
+    decl = load_declaration(api_files(args.api), 1)
+    texts = [c.text for c in all_comments(decl) if c.text is not None and '<' in c.text]
+    print("%d descriptions with html, %.1f MB" % (len(texts), sum(len(t) for t in texts) / 1e6))
+    printers = [('html-printer', pretty_print_html)]
+    if BeautifulSoup is None:
+        print("bs4 is not installed, only timing the html printer")
+    else:
+        printers.insert(0, ('beautifulsoup', beautiful_soup_print))
+    for name, pretty_print in printers:
+        seconds = min(print_all(texts, pretty_print) for _ in range(args.rounds))
+        print("%-14s %6.3fs  (best of %d)" % (name, seconds, args.rounds))
@@ -0,0 +1,38 @@
+"""
+Compares serial and parallel loading of the downloaded api files, and checks that the generated output is identical.
+Run from the repository root: python -m scripts.benchmarks.bench_load [--api api/]
+"""
+import argparse
+import time
+from typing import *
+
+from scripts.util import ts_structures
+from scripts.util.api_store import api_files
+from scripts.util.loading import DEFAULT_JOBS, load_libraries
+from scripts.util.ts_structures import Declaration
+
+
+def render_all(decl: Declaration) -> Dict[str, str]:
+    return {file_name: ns.render('', file_name[:-len('.d.ts')]) for file_name, ns in decl.files()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark loading the api files with different numbers of processes")
+    parser.add_argument("--api", default="api/", help="directory with the downloaded api files")
+    parser.add_argument("--jobs", type=int, nargs='+', default=sorted({1, 2, 4, DEFAULT_JOBS}))
+    args = parser.parse_args()
+
+    ts_structures.ENABLE_SOURCE_LINKS_WITH_LINE_NUMBERS = False  # only compare, don't go to the network
+    libs = api_files(args.api)
+    reference = None
+    for jobs in args.jobs:
+        decl = Declaration()
+        start = time.perf_counter()
+        load_libraries(decl, libs, jobs)
+        seconds = time.perf_counter() - start
+        decl.clean_up()
+        output = render_all(decl)
+        identical = reference is None or output == reference
+        reference = reference or output
+        print("jobs=%3d  load: %6.2fs  %d libraries, %d files%s" % (
+            jobs, seconds, len(libs), len(output), '' if identical else '  OUTPUT DIFFERS!'))
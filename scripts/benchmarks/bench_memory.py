@@ -0,0 +1,56 @@
+"""
+Measures the peak memory (RSS) of loading all api files, once with json.load and once streaming the symbols,
+and once with worker processes decoding them (the peak of the main process, which merges their digests).
+Every variant runs in a fresh process, since the peak RSS of a process never goes down again.
+Run from the repository root: python -m scripts.benchmarks.bench_memory [--api api/] [--jobs 4]
+(needs the `resource` module, so it does not run on windows)
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+from scripts.util.api_store import api_files, read_api_file
+from scripts.util.loading import DEFAULT_JOBS, load_libraries, read_symbols
+from scripts.util.ts_structures import Declaration
+
+
+MODES = {
+    'json.load': lambda decl, libs, jobs: [decl.load(json.loads(read_api_file(path)), lib) for lib, path in libs],
+    'streaming': lambda decl, libs, jobs: load_libraries(decl, libs, 1),
+    'workers': lambda decl, libs, jobs: load_libraries(decl, libs, jobs),
+}
+
+
+def peak_rss_mb() -> float:
+    """ru_maxrss is in kilobytes on linux, but in bytes on mac"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3
+
+
+def run_child(mode: str, api: str, jobs: int):
+    baseline = peak_rss_mb()
+    decl = Declaration()
+    start = time.perf_counter()
+    MODES[mode](decl, api_files(api), jobs)
+    print(json.dumps({'seconds': time.perf_counter() - start, 'peak': peak_rss_mb(), 'baseline': baseline}))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the peak memory of loading with and without streaming")
+    parser.add_argument("--api", default="api/", help="directory with the downloaded api files")
+    parser.add_argument("--jobs", type=int, default=max(2, DEFAULT_JOBS), help="worker processes (default: %(default)s)")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        run_child(args.child, args.api, args.jobs)
+        sys.exit(0)
+    for mode in MODES:
+        out = subprocess.run([sys.executable, '-m', 'scripts.benchmarks.bench_memory', '--api', args.api,
+                              '--jobs', str(args.jobs), '--child', mode], check=True, capture_output=True, text=True).stdout
+        result = json.loads(out)
+        print("%-10s  load: %6.2fs  peak RSS: %7.1f MB  (%.1f MB before loading)" % (
+            mode, result['seconds'], result['peak'], result['baseline']))
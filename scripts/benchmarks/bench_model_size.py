@@ -0,0 +1,51 @@
+"""
+Shows how much memory the loaded model takes: the footprint of each model object, and the whole heap after loading.
+Run from the repository root: python -m scripts.benchmarks.bench_model_size [--api api/]
+"""
+import argparse
+import gc
+import sys
+import tracemalloc
+from typing import *
+
+from scripts.util import ts_structures, ts_typing
+from scripts.util.api_store import api_files
+from scripts.util.loading import load_libraries
+from scripts.util.ts_structures import Declaration
+
+
+MODEL_CLASSES = [ts_structures.Parameter, ts_structures.Method, ts_structures.Class, ts_structures.Enum,
+                 ts_structures.Typedef, ts_structures.Namespace, ts_typing.TypeLiteral, ts_typing.CombinedType,
+                 ts_typing.ArrayType, ts_typing.GenericType, ts_typing.ObjectType, ts_typing.CommentedType]
+
+
+def footprint(obj) -> int:
+    """the object itself plus its attribute dict, if it has one (not the objects referenced by the attributes)"""
+    size = sys.getsizeof(obj)
+    if hasattr(obj, '__dict__'):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the memory footprint of the loaded model")
+    parser.add_argument("--api", default="api/", help="directory with the downloaded api files")
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    decl = Declaration()
+    load_libraries(decl, api_files(args.api), 1)
+    decl.clean_up()
+    gc.collect()
+    heap, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    counts = {cls: [0, 0] for cls in MODEL_CLASSES}
+    for obj in gc.get_objects():
+        if type(obj) in counts:
+            counts[type(obj)][0] += 1
+            counts[type(obj)][1] += footprint(obj)
+    print("%-14s %10s %12s %12s" % ("class", "instances", "bytes each", "total MB"))
+    for cls, (count, size) in counts.items():
+        print("%-14s %10d %12.0f %12.2f" % (cls.__name__, count, size / max(count, 1), size / 1e6))
+    print("\nheap after loading and cleaning up: %.1f MB (peak %.1f MB)" % (heap / 1e6, peak / 1e6))
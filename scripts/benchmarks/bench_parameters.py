@@ -0,0 +1,122 @@
+"""
+Checks that Method.shift_optional_parameters gives the same signatures as the previous, step by step implementation
+on random signatures (also once object parameters are replaced by their sub parameters), and times both on methods
+with many parameters.
+The previous implementation repeated names and union options, e.g. aOrBOrBOrC, so those are compared without repeats.
+Run from the repository root: python -m scripts.benchmarks.bench_parameters [--signatures 10000] [--width 3 5 10 20]
+"""
+import argparse
+import copy
+import random
+import time
+from typing import *
+
+from scripts.util.ts_structures import Method
+from scripts.util.util_functions import capitalize_first
+
+TYPES = ['string', 'int', 'boolean', 'object', 'function', 'sap.ui.core.Control', 'string[]', 'any']
+
+
+def step_by_step_shift(method: Method):
+    """how optional parameters were shifted before: one transition after the other, merging pairs of parameters"""
+    parameters = method.parameters
+
+    def first_optional_index() -> int:
+        for i, p in enumerate(parameters):
+            if p.optional:
+                return i
+        return -42
+
+    def shift_optional_parameter(index: int):
+        first = first_optional_index()
+        shift_distance = index - first
+        assert shift_distance >= 1
+        parameters[first].optional = False
+        parameters[index].optional = True
+        for i in range(first, len(parameters)):
+            for o in range(1, shift_distance + 1):
+                if i + o < len(parameters):
+                    parameters[i].name = parameters[i].name + 'Or' + capitalize_first(parameters[i + o].name)
+                    parameters[i].type = parameters[i].type.combine_with(parameters[i + o].type)
+
+    if len(parameters) <= 1:
+        return
+    for i in range(1, len(parameters)):
+        if parameters[i - 1].optional and not parameters[i].optional:
+            shift_optional_parameter(i)
+
+
+def random_method(rng: random.Random, width: int) -> Method:
+    json_parameters = []
+    for i in range(width):
+        types = [{'name': rng.choice(TYPES)} for _ in range(rng.randint(1, 3))]
+        # the names must not contain 'Or', so that merged names can be split again
+        json_parameters.append({'name': 'p' + str(i), 'types': types, 'optional': rng.random() < 0.5})
+        if types[0]['name'] == 'object':
+            json_parameters.extend({'name': 's' + str(s), 'types': [{'name': rng.choice(TYPES)}], 'depth': 1}
+                                   for s in range(rng.randint(1, 2)))
+    return Method('sap.bench.Class', 'sap.bench', {'name': 'method', 'parameters': json_parameters})
+
+
+def without_repeats(name: str) -> str:
+    parts = name.split('Or')
+    return 'Or'.join(dict.fromkeys([parts[0]] + parts[1:]))
+
+
+def signature(method: Method, dedupe: bool) -> List[Tuple[str, bool, Any]]:
+    result = []
+    for p in method.parameters:
+        options = tuple(dict.fromkeys(p.type.union_options()))
+        p.clean_up()
+        result.append((without_repeats(p.name) if dedupe else p.name, p.optional, options, type(p.type),
+                       p.type.written()))
+    return result
+
+
+def check(signatures: int, max_width: int, seed: int) -> int:
+    rng = random.Random(seed)
+    failures = 0
+    for _ in range(signatures):
+        method = random_method(rng, rng.randint(0, max_width))
+        reference = copy.deepcopy(method)
+        step_by_step_shift(reference)
+        method.shift_optional_parameters()
+        if signature(method, False) != signature(reference, True):
+            failures += 1
+            if failures <= 3:
+                print("DIFFERS: " + ", ".join(p.name + ('?' if p.optional else '') for p in reference.parameters))
+    return failures
+
+
+def time_shift(methods: List[Method], shift: Callable[[Method], None], rounds: int) -> float:
+    """the best of `rounds`, each on fresh copies of the methods"""
+    best = None
+    for _ in range(rounds):
+        copies = copy.deepcopy(methods)
+        start = time.perf_counter()
+        for method in copies:
+            shift(method)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check and benchmark shifting optional parameters")
+    parser.add_argument("--signatures", type=int, default=10000, help="random signatures to compare")
+    parser.add_argument("--max-width", type=int, default=8, help="most parameters of the random signatures")
+    parser.add_argument("--width", type=int, nargs='+', default=[3, 5, 10, 15, 20],
+                        help="parameters of the timed methods")
+    parser.add_argument("--methods", type=int, default=200, help="methods to time for each width")
+    parser.add_argument("--rounds", type=int, default=5, help="how often to time each width, the best counts")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    failures = check(args.signatures, args.max_width, args.seed)
+    print("%d random signatures, %d differ" % (args.signatures, failures))
+    rng = random.Random(args.seed)
+    for width in args.width:
+        methods = [random_method(rng, width) for _ in range(args.methods)]
+        before = time_shift(methods, step_by_step_shift, 1 if width > 15 else args.rounds)  # exponential
+        after = time_shift(methods, Method.shift_optional_parameters, args.rounds)
+        print("%3d parameters  step by step: %8.4fs  single pass: %8.4fs" % (width, before, after))
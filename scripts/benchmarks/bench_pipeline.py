@@ -0,0 +1,87 @@
+"""
+Times every phase of the generator (load, clean up, write) and its peak memory on synthetic corpora of growing size,
+to see how each phase scales along one dimension of the corpus (see `corpus.CorpusShape`), without the real api.
+Every size runs in a fresh process, since the peak RSS of a process never goes down again.
+The exp columns estimate how a phase grows with the size of the corpus in bytes: about 1 is linear, 2 quadratic.
+Run from the repository root: python -m scripts.benchmarks.bench_pipeline [--vary libs] [--factors 1 2 4] [...]
+(needs the `resource` module, so it does not run on windows)
+"""
+import argparse
+import json
+import math
+import subprocess
+import sys
+import tempfile
+from typing import *
+
+from scripts.benchmarks.bench_memory import peak_rss_mb
+from scripts.benchmarks.corpus import DIMENSIONS, CorpusGenerator, add_shape_arguments, shape_from
+from scripts.util import ts_structures
+from scripts.util.api_store import api_files
+from scripts.util.loading import load_libraries
+from scripts.util.profiling import PROFILE
+from scripts.util.ts_structures import Declaration
+
+
+PHASES = ('load', 'clean_up', 'write')
+
+
+def run_child(api: str, target: str, jobs: int):
+    ts_structures.ENABLE_SOURCE_LINKS_WITH_LINE_NUMBERS = False  # don't go to the network
+    decl = Declaration()
+    load_libraries(decl, api_files(api), jobs)
+    decl.clean_up()
+    decl.save_to(target, jobs)
+    print(json.dumps({'phases': PROFILE.phases, 'counts': PROFILE.counts, 'peak': peak_rss_mb()}))
+
+
+def measure(api: str, jobs: int) -> dict:
+    with tempfile.TemporaryDirectory() as target:
+        out = subprocess.run([sys.executable, '-m', 'scripts.benchmarks.bench_pipeline', '--child', api, target + '/',
+                              '--jobs', str(jobs)], check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().split('\n')[-1])
+
+
+def exponent(previous: Tuple[float, float], current: Tuple[float, float]) -> Optional[float]:
+    """the k in time ~ size^k, between two (size, time) measurements"""
+    if previous[0] <= 0 or current[0] <= previous[0] or previous[1] <= 0 or current[1] <= 0:
+        return None
+    return math.log(current[1] / previous[1]) / math.log(current[0] / previous[0])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the generator phases on synthetic corpora of growing size")
+    parser.add_argument("--vary", choices=DIMENSIONS, default='libs', help="the dimension to scale (default: %(default)s)")
+    parser.add_argument("--factors", type=float, nargs='+', default=[0.25, 0.5, 1, 2],
+                        help="sizes of the scaled dimension, relative to the shape (default: %(default)s)")
+    parser.add_argument("--jobs", type=int, default=1, help="processes for loading and writing (default: %(default)s)")
+    parser.add_argument("--json", metavar="FILE", help="also write all measurements as json, e.g. to track regressions")
+    parser.add_argument("--child", nargs=2, metavar=("API", "TARGET"), help=argparse.SUPPRESS)
+    add_shape_arguments(parser)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        run_child(args.child[0], args.child[1], args.jobs)
+        sys.exit(0)
+    base = shape_from(args)
+    results = []
+    print("%-14s %8s %9s" % (args.vary, 'symbols', 'MB') + ''.join('%10s %5s' % (phase, 'exp') for phase in PHASES) +
+          "%10s" % 'peak MB')
+    for factor in args.factors:
+        shape = base.scaled(args.vary, factor)
+        with tempfile.TemporaryDirectory() as api:
+            size = CorpusGenerator(shape).write(api)
+            result = measure(api + '/', args.jobs)
+        result.update({'shape': vars(shape), 'bytes': size})
+        line = "%-14s %8d %9.1f" % (getattr(shape, args.vary), result['counts']['symbols'], size / 1e6)
+        for phase in PHASES:
+            seconds = result['phases'].get(phase, 0.0)
+            k = None
+            if len(results) > 0:
+                k = exponent((results[-1]['bytes'], results[-1]['phases'].get(phase, 0.0)), (size, seconds))
+            line += "%9.2fs %5s" % (seconds, '' if k is None else '%.2f' % k)
+        print(line + "%10.1f" % result['peak'])
+        results.append(result)
+    if args.json is not None:
+        with open(args.json, 'w', encoding='utf8') as f:
+            json.dump({'vary': args.vary, 'jobs': args.jobs, 'results': results}, f, indent=1)
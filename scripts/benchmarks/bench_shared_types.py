@@ -0,0 +1,50 @@
+"""
+Compares the size of the declaration files with and without type aliases for repeated object literal types.
+With --tsc, it also times type checking all files, as a stand-in for how long an IDE takes to index them
+(e.g. --tsc "npx tsc", needs typescript).
+Run from the repository root: python -m scripts.benchmarks.bench_shared_types [--api api/] [--tsc "npx tsc"]
+"""
+import argparse
+import os
+import shlex
+import subprocess
+import tempfile
+import time
+from typing import *
+
+from scripts.util import ts_structures
+from scripts.util.api_store import api_files
+from scripts.util.build_state import load_declaration
+
+
+def generate(libs: List[Tuple[str, str]], target: str, shared: bool) -> Tuple[int, int]:
+    """writes all files to `target`, returns (total size in bytes, number of type aliases)"""
+    ts_structures.ENABLE_SHARED_OBJECT_TYPES = shared
+    decl = load_declaration(libs, 1)
+    decl.save_to(target, 1)
+    size = sum(os.path.getsize(os.path.join(target, name)) for name in os.listdir(target))
+    return size, decl.counts()['shared types']
+
+
+def type_check(tsc: str, target: str) -> float:
+    files = sorted(os.path.join(target, name) for name in os.listdir(target) if name.endswith('.d.ts'))
+    start = time.perf_counter()
+    subprocess.run(shlex.split(tsc) + ['--noEmit', *files], capture_output=True)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark sharing repeated object literal types")
+    parser.add_argument("--api", default="api/", help="directory with the downloaded api files")
+    parser.add_argument("--tsc", help="typescript compiler command to time type checking the output with")
+    args = parser.parse_args()
+
+    ts_structures.ENABLE_SOURCE_LINKS_WITH_LINE_NUMBERS = False  # don't go to the network
+    libs = api_files(args.api)
+    for shared in (False, True):
+        with tempfile.TemporaryDirectory() as target:
+            size, aliases = generate(libs, target + '/', shared)
+            line = "%-14s %8.2f MB  %6d type aliases" % ('shared' if shared else 'inline', size / 1e6, aliases)
+            if args.tsc is not None:
+                line += "  tsc: %6.2fs" % type_check(args.tsc, target)
+            print(line)
@@ -0,0 +1,45 @@
+"""
+Compares building the model from the api files (loading and cleaning up) with reading it from a snapshot,
+and checks that both give the same declaration files.
+Run from the repository root: python -m scripts.benchmarks.bench_snapshot [--api api/] [--rounds 3]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from scripts.util import ts_structures
+from scripts.util.api_store import api_files
+from scripts.util.build_state import input_hashes, load_declaration
+from scripts.util.snapshot import load_snapshot, save_snapshot
+from scripts.benchmarks.bench_load import render_all
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark reading the model from a snapshot")
+    parser.add_argument("--api", default="api/", help="directory with the downloaded api files")
+    parser.add_argument("--rounds", type=int, default=3, help="how often to read everything (default: %(default)s)")
+    args = parser.parse_args()
+
+    ts_structures.ENABLE_SOURCE_LINKS_WITH_LINE_NUMBERS = False  # only compare, don't go to the network
+    libs = api_files(args.api)
+    inputs = input_hashes(args.api)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'declaration.snapshot')
+        best_parse = best_save = best_snapshot = float('inf')
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            decl = load_declaration(libs, 1)
+            parsed = time.perf_counter()
+            save_snapshot(decl, path, inputs)
+            saved = time.perf_counter()
+            snapshot = load_snapshot(path, inputs)
+            done = time.perf_counter()
+            best_parse = min(best_parse, parsed - start)
+            best_save = min(best_save, saved - parsed)
+            best_snapshot = min(best_snapshot, done - saved)
+        size = os.path.getsize(path)
+    print("%d libraries  load + clean up: %6.3fs  save snapshot: %6.3fs  read snapshot: %6.3fs  (%.1f MB, best of %d)"
+          % (len(libs), best_parse, best_save, best_snapshot, size / 1e6, args.rounds))
+    if render_all(decl) != render_all(snapshot):
+        print("OUTPUT DIFFERS!")
@@ -0,0 +1,68 @@
+"""
+Compares storing the api files as plain json with storing them compressed (see `api_store.COMPRESSIONS`):
+how much smaller they get, how long compressing them takes when downloading,
+and how much longer decoding them takes when generating, serially and by worker processes.
+Run from the repository root: python -m scripts.benchmarks.bench_store [--api api/] [--jobs 4] [--rounds 3]
+(zstd is only measured if `zstandard` is installed)
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from scripts.util.api_store import COMPRESSIONS, api_files, compress, read_api_file
+from scripts.util.loading import DEFAULT_JOBS, digest_library
+
+
+def available(compression: str) -> bool:
+    if compression != 'zstd':
+        return True
+    try:
+        import zstandard
+        return True
+    except ImportError:
+        return False
+
+
+def decode_all(paths, jobs: int) -> float:
+    start = time.perf_counter()
+    if jobs <= 1:
+        for path in paths:
+            digest_library(path)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            list(pool.map(digest_library, paths))
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark compressed api files")
+    parser.add_argument("--api", default="api/", help="directory with the downloaded api files")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS, help="worker processes (default: %(default)s)")
+    parser.add_argument("--rounds", type=int, default=3, help="how often to decode everything (default: %(default)s)")
+    args = parser.parse_args()
+
+    libs = api_files(args.api)
+    contents = {lib: read_api_file(path) for lib, path in libs}
+    plain_size = sum(len(data) for data in contents.values())
+    print("%d api files, %.1f MB of json" % (len(libs), plain_size / 1e6))
+    print("%-6s %9s %6s %11s %13s %13s" % ('format', 'MB', 'ratio', 'compress', 'decode', 'decode -j%d' % args.jobs))
+    with tempfile.TemporaryDirectory() as directory:
+        for compression in [None, *COMPRESSIONS]:
+            if compression is not None and not available(compression):
+                continue
+            suffix = COMPRESSIONS.get(compression, '.json')
+            start = time.perf_counter()
+            stored = {lib: compress(data, compression) for lib, data in contents.items()}
+            compress_seconds = time.perf_counter() - start
+            paths = []
+            for lib, data in stored.items():
+                paths.append(os.path.join(directory, lib + suffix))
+                with open(paths[-1], 'wb') as f:
+                    f.write(data)
+            size = sum(len(data) for data in stored.values())
+            serial = min(decode_all(paths, 1) for _ in range(args.rounds))
+            parallel = min(decode_all(paths, args.jobs) for _ in range(args.rounds))
+            print("%-6s %9.1f %5.1fx %10.2fs %12.2fs %12.2fs" % (compression or 'json', size / 1e6, plain_size / size,
+                                                                 compress_seconds, serial, parallel))
@@ -0,0 +1,63 @@
+"""
+Times parsing and writing every type that occurs in the downloaded api files, with and without the caches.
+Run from the repository root: python -m scripts.benchmarks.bench_types [--api api/] [--rounds 5]
+"""
+import argparse
+import time
+from typing import *
+
+from scripts.util.api_store import api_files
+from scripts.util.loading import read_symbols
+from scripts.util.ts_typing import TsType, parse_type, try_parse_type
+
+
+def collect_types(node: Any, found: List[dict]):
+    """all json types of parameters, return values and properties, in document order"""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == 'types' and isinstance(value, list):
+                found.extend(t for t in value if isinstance(t, dict))
+            else:
+                collect_types(value, found)
+    elif isinstance(node, list):
+        for item in node:
+            collect_types(item, found)
+
+
+def parse_all(json_types: List[dict]) -> float:
+    start = time.perf_counter()
+    for json_type in json_types:
+        parse_type(TsType.parse_type_name(json_type)).written()
+    return time.perf_counter() - start
+
+
+def parse_all_uncached(json_types: List[dict]) -> float:
+    start = time.perf_counter()
+    for json_type in json_types:
+        parse_type.cache_clear()
+        try_parse_type.cache_clear()
+        parse_type(TsType.parse_type_name(json_type)).render()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark parsing all type names of the api files")
+    parser.add_argument("--api", default="api/", help="directory with the downloaded api files")
+    parser.add_argument("--rounds", type=int, default=5, help="how often to parse all types (default: %(default)s)")
+    args = parser.parse_args()
+
+    json_types = []
+    for lib, path in api_files(args.api):
+        for symbol in read_symbols(path):
+            collect_types(symbol, json_types)
+    print("%d types, %d distinct names" % (len(json_types), len({t.get('name', t.get('value')) for t in json_types})))
+
+    uncached = sum(parse_all_uncached(json_types) for _ in range(args.rounds))
+    parse_type.cache_clear()
+    try_parse_type.cache_clear()
+    cached = sum(parse_all(json_types) for _ in range(args.rounds))
+
+    info = parse_type.cache_info()
+    print("uncached: %6.3fs  cached: %6.3fs  (%d rounds)" % (uncached, cached, args.rounds))
+    print("cache: %d hits, %d misses (%.1f%% hit rate), %d distinct parsed types" % (
+        info.hits, info.misses, 100 * info.hits / max(info.hits + info.misses, 1), info.currsize))
@@ -0,0 +1,104 @@
+"""
+Compares generating several versions of the api in a run for each with generating them all in one run,
+which decodes api files of equal content once (see `loading.DigestCache`) and marks up each description once
+(see `comment.DescriptionStore`), and checks that both give the same declaration files.
+The versions are made from one synthetic corpus (see `corpus`): from one version to the next, some of the libraries
+change a few descriptions, add a symbol and carry the new version, the others stay the same.
+Run from the repository root: python -m scripts.benchmarks.bench_versions [--versions 3] [--changed 0.3] [--jobs 1]
+"""
+import argparse
+import filecmp
+import gc
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import *
+
+from scripts.benchmarks.corpus import CorpusGenerator, add_shape_arguments, shape_from
+from scripts.util import ts_structures
+from scripts.util.api_store import api_files
+from scripts.util.loading import DigestCache, load_libraries
+from scripts.util.ts_structures import Declaration
+
+
+def next_version(previous: str, target: str, version: int, changed: float, rng: random.Random):
+    """copies the api files of the previous version, changing the given share of libraries"""
+    os.makedirs(target)
+    for name in sorted(os.listdir(previous)):
+        with open(os.path.join(previous, name), 'rb') as f:
+            data = f.read()
+        if rng.random() < changed:
+            library = json.loads(data)
+            library['version'] = '1.%d.0' % version
+            classes = [s for s in library['symbols'] if s['kind'] == 'class']
+            for symbol in rng.sample(classes, max(1, len(classes) // 10)):
+                symbol['description'] += '<p>Since 1.%d.</p>' % version
+            added = dict(rng.choice(classes), name=classes[-1]['name'] + 'V' + str(version))
+            library['symbols'].append(added)
+            data = json.dumps(library).encode('utf8')
+        with open(os.path.join(target, name), 'wb') as f:
+            f.write(data)
+
+
+def run_child(apis: List[str], target: str, jobs: int):
+    """generates the given versions in this process, the way ts_gen.py --versions does"""
+    ts_structures.ENABLE_SOURCE_LINKS_WITH_LINE_NUMBERS = False  # don't go to the network
+    cache = DigestCache()
+    start = time.perf_counter()
+    for api in apis:
+        decl = Declaration()
+        load_libraries(decl, api_files(api), jobs, cache)
+        decl.clean_up()
+        decl.save_to(os.path.join(target, os.path.basename(api), ''), jobs)
+        del decl
+        gc.collect()
+        gc.freeze()
+    print(json.dumps({'seconds': time.perf_counter() - start}))
+
+
+def measure(apis: List[str], target: str, jobs: int) -> float:
+    for api in apis:
+        os.makedirs(os.path.join(target, os.path.basename(api)))
+    out = subprocess.run([sys.executable, '-m', 'scripts.benchmarks.bench_versions', '--child', target, *apis,
+                          '--jobs', str(jobs)], check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().split('\n')[-1])['seconds']
+
+
+def same_files(a: str, b: str) -> bool:
+    names = sorted(os.listdir(a))
+    return names == sorted(os.listdir(b)) and len(filecmp.cmpfiles(a, b, names, shallow=False)[0]) == len(names)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark generating several api versions in one run")
+    parser.add_argument("--versions", type=int, default=3, help="how many versions to generate (default: %(default)s)")
+    parser.add_argument("--changed", type=float, default=0.3,
+                        help="share of the libraries that change between versions (default: %(default)s)")
+    parser.add_argument("--jobs", type=int, default=1, help="processes for loading and writing (default: %(default)s)")
+    parser.add_argument("--child", nargs='+', metavar="DIRECTORY", help=argparse.SUPPRESS)
+    add_shape_arguments(parser)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        run_child(args.child[1:], args.child[0], args.jobs)
+        sys.exit(0)
+    with tempfile.TemporaryDirectory() as directory:
+        apis = [os.path.join(directory, 'api0')]
+        CorpusGenerator(shape_from(args)).write(apis[0])
+        rng = random.Random(args.seed)
+        for version in range(1, args.versions):
+            apis.append(os.path.join(directory, 'api' + str(version)))
+            next_version(apis[-2], apis[-1], version, args.changed, rng)
+
+        separate = sum(measure([api], os.path.join(directory, 'separate'), args.jobs) for api in apis)
+        shared = measure(apis, os.path.join(directory, 'shared'), args.jobs)
+        print("separate runs: %d versions in %6.2fs" % (len(apis), separate))
+        print("one run:       %d versions in %6.2fs (%.0f%% of the separate runs)" % (
+            len(apis), shared, 100 * shared / separate))
+        differ = [api for api in apis if not same_files(os.path.join(directory, 'separate', os.path.basename(api)),
+                                                        os.path.join(directory, 'shared', os.path.basename(api)))]
+        print("output: " + ("the same" if len(differ) == 0 else "DIFFERS for " + ", ".join(differ)))
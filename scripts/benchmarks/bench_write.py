@@ -0,0 +1,40 @@
+"""
+Compares serial and parallel writing of the declaration files, and checks that the written files are identical.
+Run from the repository root: python -m scripts.benchmarks.bench_write [--api api/]
+"""
+import argparse
+import filecmp
+import os
+import tempfile
+import time
+
+from scripts.util import comment, ts_structures
+from scripts.util.api_store import api_files
+from scripts.util.build_state import load_declaration
+from scripts.util.loading import DEFAULT_JOBS
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark writing the declaration files with different numbers of processes")
+    parser.add_argument("--api", default="api/", help="directory with the downloaded api files")
+    parser.add_argument("--jobs", type=int, nargs='+', default=sorted({1, 2, 4, DEFAULT_JOBS}))
+    args = parser.parse_args()
+
+    ts_structures.ENABLE_SOURCE_LINKS_WITH_LINE_NUMBERS = False  # only compare, don't go to the network
+    decl = load_declaration(api_files(args.api))
+    with tempfile.TemporaryDirectory() as tmp:
+        reference = None
+        for jobs in args.jobs:
+            target = os.path.join(tmp, 'jobs' + str(jobs)) + '/'
+            os.makedirs(target, exist_ok=True)
+            comment.DESCRIPTIONS.clear()  # every run marks up everything, like a fresh run of the generator
+            start = time.perf_counter()
+            written = decl.save_to(target, jobs)
+            seconds = time.perf_counter() - start
+            names = sorted(os.listdir(target))
+            identical = reference is None or (names == sorted(os.listdir(reference)) and
+                                              filecmp.cmpfiles(reference, target, names, shallow=False)[0] == names)
+            reference = reference or target
+            size = sum(os.path.getsize(target + name) for name in names)
+            print("jobs=%3d  write: %6.2fs  %d files, %.1f MB%s" % (
+                jobs, seconds, len(written), size / 1e6, '' if identical else '  OUTPUT DIFFERS!'))
@@ -0,0 +1,219 @@
+"""
+Generates a synthetic corpus of api.json files that look like the real UI5 api: namespaces with classes, enums and
+typedefs, classes that extend each other and refer to each other in types and doc links, events with generated
+attach/detach/fire methods, bind methods that all take the same object, nested object parameters, union types
+and html descriptions.
+The same shape and seed always give the same files.
+Run from the repository root: python -m scripts.benchmarks.corpus TARGET_DIRECTORY [--libs 28] [--classes 20] ...
+"""
+import argparse
+import json
+import os
+import random
+from typing import *
+
+
+WORDS = ('the', 'control', 'value', 'is', 'used', 'for', 'a', 'binding', 'model', 'item', 'event', 'when', 'this',
+         'property', 'changes', 'and', 'of', 'an', 'aggregation', 'rendered', 'default', 'to', 'be', 'set', 'by')
+BASIC_TYPES = ('string', 'int', 'float', 'boolean', 'object', 'any', 'function', 'Date', 'string[]', 'Promise')
+
+
+class CorpusShape:
+    """how big the corpus is along each dimension, all counts are per parent (e.g. methods per class)"""
+    libs: int
+    namespaces: int
+    classes: int
+    methods: int
+    parameters: int
+    depth: int  # of nested object parameters, 0 for flat parameters only
+    union_width: int  # the most types a parameter or return value can have
+    description_length: int  # words in a description
+    seed: int
+
+    def __init__(self, libs: int = 28, namespaces: int = 3, classes: int = 20, methods: int = 12, parameters: int = 3,
+                 depth: int = 1, union_width: int = 3, description_length: int = 40, seed: int = 0):
+        self.libs = libs
+        self.namespaces = namespaces
+        self.classes = classes
+        self.methods = methods
+        self.parameters = parameters
+        self.depth = depth
+        self.union_width = union_width
+        self.description_length = description_length
+        self.seed = seed
+
+    def scaled(self, dimension: str, factor: float) -> 'CorpusShape':
+        shape = CorpusShape(**vars(self))
+        setattr(shape, dimension, max(1, round(getattr(self, dimension) * factor)))
+        return shape
+
+
+DIMENSIONS = [name for name in vars(CorpusShape()) if name != 'seed']
+
+
+class CorpusGenerator:
+    shape: CorpusShape
+    random: random.Random
+    classes: List[str]  # full names of the classes generated so far, for extends, types and links
+
+    def __init__(self, shape: CorpusShape):
+        self.shape = shape
+        self.random = random.Random(shape.seed)
+        self.classes = []
+
+    def lib_name(self, index: int) -> str:
+        # every other library is a sub library of the one before, like sap.ui.core and sap.ui.core.dnd
+        return 'sap.bench' + str(index // 2) + ('.sub' if index % 2 == 1 else '')
+
+    def description(self, words: int = None) -> str:
+        words = self.shape.description_length if words is None else words
+        parts = []
+        for i in range(words):
+            roll = self.random.random()
+            word = self.random.choice(WORDS)
+            if roll < 0.03 and len(self.classes) > 0:
+                target = self.random.choice(self.classes)
+                parts.append('<a target="_self" href="#/api/' + target + '">' + target + '</a>')
+            elif roll < 0.06:
+                parts.append('<code>' + word + '</code>')
+            elif roll < 0.07:
+                parts.append('</p><p>' + word)
+            elif roll < 0.075:
+                parts.append('<ul><li>' + word + '</li><li>' + self.random.choice(WORDS) + '</li></ul>')
+            elif roll < 0.078:
+                parts.append('<pre>\nvar ' + word + ' = 1;\n</pre>')
+            else:
+                parts.append(word)
+        return '<p>' + ' '.join(parts) + '</p>'
+
+    def types(self) -> List[dict]:
+        names = []
+        for i in range(self.random.randint(1, self.shape.union_width)):
+            if len(self.classes) > 0 and self.random.random() < 0.4:
+                names.append(self.random.choice(self.classes))
+            else:
+                names.append(self.random.choice(BASIC_TYPES))
+        return [{'name': name} for name in names]
+
+    def parameters(self, count: int, depth: int) -> List[dict]:
+        parameters = []
+        for i in range(count):
+            nested = depth < self.shape.depth and self.random.random() < 0.3
+            parameters.append({
+                'name': 'p' + str(i),
+                'types': [{'name': 'object'}] if nested else self.types(),
+                'optional': self.random.random() < 0.4,
+                'depth': depth,
+                'description': self.description(self.shape.description_length // 4),
+            })
+            if nested:
+                parameters.extend(self.parameters(max(1, count - 1), depth + 1))
+        return parameters
+
+    def method(self, name: str, description: str = None) -> dict:
+        method = {
+            'name': name,
+            'visibility': 'public',
+            'description': self.description() if description is None else description,
+            'parameters': self.parameters(self.random.randint(0, self.shape.parameters), 0),
+        }
+        if self.random.random() < 0.7:
+            method['returnValue'] = {'types': self.types()}
+        return method
+
+    def event_methods(self, event: str) -> List[dict]:
+        """like the generated methods of ui5 events, whose descriptions repeat verbatim in every class"""
+        capitalized = event[0].upper() + event[1:]
+        return [self.method(verb + capitalized, 'Attaches, detaches or fires event <code>' + event + '</code>.')
+                for verb in ('attach', 'detach', 'fire')]
+
+    def bind_method(self) -> dict:
+        """like the generated bind methods of ui5 aggregations, which all take the same binding info object"""
+        fields = [('path', 'string', False), ('template', 'sap.ui.base.ManagedObject', True),
+                  ('templateShareable', 'boolean', True), ('sorter', 'sap.ui.model.Sorter', True)]
+        parameters = [{'name': 'oBindingInfo', 'types': [{'name': 'object'}], 'depth': 0,
+                       'description': 'The binding information'}]
+        parameters.extend({'name': name, 'types': [{'name': type_name}], 'optional': optional, 'depth': 1,
+                           'description': 'The ' + name} for name, type_name, optional in fields)
+        return {'name': 'bindItems', 'visibility': 'public', 'parameters': parameters,
+                'description': 'Binds aggregation <code>items</code> to model data.'}
+
+    def class_symbol(self, name: str) -> dict:
+        symbol = {
+            'kind': 'class',
+            'name': name,
+            'basename': name.split('.')[-1],
+            'visibility': 'public',
+            'description': self.description(),
+            'constructor': self.method('constructor'),
+            'hasSample': self.random.random() < 0.2,
+        }
+        if len(self.classes) > 0 and self.random.random() < 0.8:
+            symbol['extends'] = self.random.choice(self.classes)
+        methods = []
+        for i in range(self.shape.methods):
+            if i % 4 == 3:
+                methods.extend(self.event_methods('event' + str(i)))
+            else:
+                methods.append(self.method('method' + str(i)))
+        if self.random.random() < 0.5:
+            methods.append(self.bind_method())
+        if self.random.random() < 0.3:
+            methods.append(self.method(name + '.create'))  # a static method
+        symbol['methods'] = methods
+        return symbol
+
+    def enum_symbol(self, name: str) -> dict:
+        return {'kind': 'enum', 'name': name, 'basename': name.split('.')[-1], 'description': self.description(),
+                'properties': [{'name': name + '.Option' + str(i), 'description': self.description(10)}
+                               for i in range(5)]}
+
+    def typedef_symbol(self, name: str) -> dict:
+        return {'kind': 'typedef', 'name': name, 'basename': name.split('.')[-1], 'description': self.description(),
+                'ui5-metadata': {'stereotype': 'datatype', 'basetype': 'string'}}
+
+    def library(self, index: int) -> dict:
+        lib = self.lib_name(index)
+        symbols = [{'kind': 'namespace', 'name': lib, 'description': self.description()}]
+        for n in range(self.shape.namespaces):
+            namespace = lib + '.ns' + str(n)
+            symbols.append({'kind': 'namespace', 'name': namespace, 'description': self.description()})
+            symbols.append(self.enum_symbol(namespace + '.Mode'))
+            symbols.append(self.typedef_symbol(namespace + '.CSSSize'))
+            for c in range(self.shape.classes):
+                name = namespace + '.Class' + str(c)
+                symbols.append(self.class_symbol(name))
+                self.classes.append(name)
+        return {'library': lib, 'symbols': symbols}
+
+    def write(self, directory: str) -> int:
+        """writes one api.json per library into `directory`, returns the total size in bytes"""
+        os.makedirs(directory, exist_ok=True)
+        size = 0
+        for index in range(self.shape.libs):
+            library = self.library(index)
+            data = json.dumps(library).encode('utf8')
+            with open(os.path.join(directory, library['library'] + '.json'), 'wb') as f:
+                f.write(data)
+            size += len(data)
+        return size
+
+
+def add_shape_arguments(parser: argparse.ArgumentParser):
+    defaults = CorpusShape()
+    for name in DIMENSIONS + ['seed']:
+        parser.add_argument('--' + name.replace('_', '-'), type=int, default=getattr(defaults, name),
+                            help="(default: %(default)s)")
+
+
+def shape_from(args) -> CorpusShape:
+    return CorpusShape(**{name: getattr(args, name) for name in DIMENSIONS + ['seed']})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic UI5 api corpus")
+    parser.add_argument("target", help="directory to write the api.json files to")
+    add_shape_arguments(parser)
+    args = parser.parse_args()
+    size = CorpusGenerator(shape_from(args)).write(args.target)
+    print("%d libraries, %.1f MB" % (args.libs, size / 1e6))
@@ -0,0 +1,115 @@
+"""
+A local stand-in for the UI5 documentation server, so that downloading can be benchmarked offline.
+It serves the same url layout as the real server (api index + one api.json per library, also below a version
+like /1.71.0/, which serves the same files), with generated payloads and an artificial per-request latency.
+"""
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import *
+
+
+def make_index(num_libs: int) -> dict:
+    """a two-level library tree, like the real index (e.g. sap.ui.core -> sap.ui.core.dnd)"""
+    symbols = []
+    for i in range(num_libs // 2):
+        node = {'lib': 'sap.fake' + str(i)}
+        if 2 * i + 1 < num_libs:
+            node['nodes'] = [{'lib': 'sap.fake' + str(i) + '.sub'}]
+        symbols.append(node)
+    if num_libs % 2 == 1:
+        symbols.append({'lib': 'sap.fake' + str(num_libs // 2)})
+    # the real index sometimes lists a library twice
+    if len(symbols) > 0:
+        symbols.append({'lib': symbols[0]['lib']})
+    return {'symbols': symbols}
+
+
+def make_library(lib: str, payload_size: int) -> dict:
+    description = 'x' * 100
+    symbols = []
+    for i in range(max(1, payload_size // 200)):
+        symbols.append({'kind': 'class', 'name': lib + '.Class' + str(i), 'description': description})
+    return {'library': lib, 'symbols': symbols}
+
+
+class FakeUi5Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, port: int, num_libs: int, latency: float, payload_size: int):
+        ThreadingHTTPServer.__init__(self, ('127.0.0.1', port), FakeUi5Handler)
+        self.latency = latency
+        self.index = json.dumps(make_index(num_libs)).encode('utf8')
+        self.payload_size = payload_size
+        self.libraries = {}
+
+    def url(self) -> str:
+        return 'http://127.0.0.1:' + str(self.server_address[1])
+
+    def change_library(self, lib: str):
+        """simulates a new release of a single library"""
+        self.libraries[lib] = json.dumps(make_library(lib, self.payload_size + 200)).encode('utf8')
+
+    def library_payload(self, lib: str) -> bytes:
+        if lib not in self.libraries:
+            self.libraries[lib] = json.dumps(make_library(lib, self.payload_size)).encode('utf8')
+        return self.libraries[lib]
+
+
+VERSION_PREFIX = re.compile(r"^/\d[^/]*(?=/)")
+
+
+class FakeUi5Handler(BaseHTTPRequestHandler):
+    server: FakeUi5Server
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        payload = None
+        path = VERSION_PREFIX.sub('', self.path)
+        if path == '/docs/api/api-index.json':
+            payload = self.server.index
+        elif path.startswith('/test-resources/') and path.endswith('/designtime/apiref/api.json'):
+            lib = path[len('/test-resources/'):-len('/designtime/apiref/api.json')].replace('/', '.')
+            payload = self.server.library_payload(lib)
+        if payload is None:
+            self.send_error(404)
+            return
+        etag = '"' + hashlib.sha1(payload).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start(port: int = 0, num_libs: int = 100, latency: float = 0.1, payload_size: int = 200000) -> FakeUi5Server:
+    """starts a server in a background thread. Port 0 picks a free port, see `FakeUi5Server.url`"""
+    server = FakeUi5Server(port, num_libs, latency, payload_size)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve fake UI5 api.json files")
+    parser.add_argument("--port", type=int, default=8555)
+    parser.add_argument("--libs", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds per request")
+    parser.add_argument("--payload-size", type=int, default=200000, help="approximate bytes per api.json")
+    args = parser.parse_args()
+    s = FakeUi5Server(args.port, args.libs, args.latency, args.payload_size)
+    print("Serving on " + s.url() + " - use download.py --base-url " + s.url())
+    s.serve_forever()
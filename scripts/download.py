@@ -1,56 +1,260 @@
+import argparse
+import hashlib
+import json
+import os
 import requests
-import requests_cache
+import sys
 import time
+from typing import *
 
-requests_cache.install_cache()
+from scripts.util.api_store import API_SUFFIXES, COMPRESSIONS, MANIFEST_FILE, ObjectStore, api_path, compress, \
+    read_api_file, version_directory
+from scripts.util.fetching import DEFAULT_JOBS, DEFAULT_RETRIES, DEFAULT_TIMEOUT, make_session, map_concurrently
+from scripts.util.profiling import PROFILE
 
-BASE_API_URL = "https://sapui5.hana.ondemand.com/docs/api/api-index.json"
-URL_START = "https://sapui5.hana.ondemand.com/test-resources/"
+UI5_HOST = "https://sapui5.hana.ondemand.com"
+API_INDEX_PATH = "/docs/api/api-index.json"
+URL_START = "/test-resources/"
 URL_END = "/designtime/apiref/api.json"
+API_DIRECTORY = "../api/"
 
 
 handled = []
+changed = []
+unchanged = []
+failed = []
+manifest: Dict[str, dict] = {}  # file_name -> {url, etag, last_modified, sha256} of what is on disk
+manifest_dirty = False
+host = UI5_HOST
+directory = API_DIRECTORY
+timeout = DEFAULT_TIMEOUT
+session: Optional[requests.Session] = None  # shared by all download threads, see `configure`
+objects: Optional[ObjectStore] = None  # where the files of specific versions are stored, see `ObjectStore`
+compression: Optional[str] = None  # how the api files are stored, see `api_store.COMPRESSIONS`
+
+
+def configure(jobs: int = DEFAULT_JOBS, base_url: str = UI5_HOST, target_directory: str = API_DIRECTORY,
+              request_timeout=DEFAULT_TIMEOUT, retries: int = DEFAULT_RETRIES, object_store: ObjectStore = None,
+              compress_as: Optional[str] = None):
+    """also starts over with the lists of handled files, so that several versions can be downloaded one after the other"""
+    global host, directory, timeout, session, objects, compression
+    host = base_url.rstrip('/')
+    directory = target_directory
+    timeout = request_timeout
+    session = make_session(jobs, retries)
+    objects = object_store
+    compression = compress_as
+    for files in (handled, changed, unchanged, failed):
+        files.clear()
+    load_manifest()
+
+
+def load_manifest():
+    global manifest, manifest_dirty
+    manifest = {}
+    manifest_dirty = False
+    try:
+        with open(directory + MANIFEST_FILE, encoding='utf8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        pass
+
+
+def save_manifest():
+    global manifest_dirty
+    if not manifest_dirty:
+        return
+    with open(directory + MANIFEST_FILE, 'w', encoding='utf8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    manifest_dirty = False
+
+
+def conditional_headers(file_name: str) -> Dict[str, str]:
+    """validators of the copy on disk, so that the server can answer with '304 Not Modified'"""
+    entry = manifest.get(file_name)
+    if entry is None or api_path(directory, file_name) is None:
+        return {}
+    headers = {}
+    if entry.get('etag'):
+        headers['If-None-Match'] = entry['etag']
+    if entry.get('last_modified'):
+        headers['If-Modified-Since'] = entry['last_modified']
+    return headers
+
+
+def read_local(file_name: str) -> dict:
+    return json.loads(read_api_file(api_path(directory, file_name)))
+
+
+def local_path(file_name: str) -> str:
+    """where the file is stored, with the suffix of the configured compression"""
+    return directory + file_name + COMPRESSIONS.get(compression, '.json')
+
+
+def write_local(file_name: str, content: bytes):
+    """writes the (uncompressed) content of an api file the configured way, replacing a copy stored another way"""
+    path = local_path(file_name)
+    data = compress(content, compression)
+    if objects is None:
+        with open(path, 'wb') as f:
+            f.write(data)
+        PROFILE.count('bytes written', len(data))
+    elif objects.link(data, hashlib.sha256(content).hexdigest(), path):
+        PROFILE.count('bytes written', len(data))
+    else:
+        PROFILE.count('bytes shared with other versions', len(data))
+    for suffix in API_SUFFIXES:
+        if directory + file_name + suffix != path and os.path.isfile(directory + file_name + suffix):
+            os.remove(directory + file_name + suffix)
 
 
 def url_for_module(name: str) -> str:
-    return URL_START + name.replace(".", "/") + URL_END
+    return host + URL_START + name.replace(".", "/") + URL_END
 
 
 def dl(url: str, file_name: str) -> dict:
     if file_name in handled:
         return {}
     handled.append(file_name)
-    req = requests.get(url)
+    return fetch(url, file_name)
+
+
+def fetch(url: str, file_name: str, parse: bool = True) -> dict:
+    """
+    downloads the file unless the copy on disk is still up to date.
+    The parsed json is only returned if `parse` is set (for unchanged files, this reads the copy on disk).
+    """
+    global manifest_dirty
+    if session is None:
+        configure()
+    start = time.perf_counter()
+    try:
+        req = session.get(url, timeout=timeout, headers=conditional_headers(file_name))
+        PROFILE.time_item('download', file_name, time.perf_counter() - start)
+    except requests.RequestException:
+        print("Cannot access " + url)
+        failed.append(file_name)
+        return {}
+
+    if req.status_code == 304:
+        print("Unchanged " + url)
+        unchanged.append(file_name)
+        if api_path(directory, file_name) != local_path(file_name):  # it was stored another way before
+            write_local(file_name, read_api_file(api_path(directory, file_name)))
+        return read_local(file_name) if parse else {}
 
     # 2. Handle error if deserialization fails (because of no text or bad format)
     try:
         result_json = req.json()
-        with open('../api/' + file_name + '.json', 'wb') as f:
-            f.write(req.content)
-        print("Success! " + url)
-        return result_json
     except ValueError:
         print("Cannot access " + url)
+        failed.append(file_name)
         return {}
+    PROFILE.count('bytes downloaded', len(req.content))
+    sha256 = hashlib.sha256(req.content).hexdigest()
+    old_entry = manifest.get(file_name, {})
+    if old_entry.get('sha256') != sha256 or api_path(directory, file_name) != local_path(file_name):
+        write_local(file_name, req.content)
+        print("Success! " + url)
+        changed.append(file_name)
+    else:
+        # the server did not validate our copy, but the content is still the same
+        print("Unchanged " + url)
+        unchanged.append(file_name)
+    new_entry = {
+        'url': url,
+        'etag': req.headers.get('ETag'),
+        'last_modified': req.headers.get('Last-Modified'),
+        'sha256': sha256,
+    }
+    if new_entry != old_entry:
+        manifest[file_name] = new_entry
+        manifest_dirty = True
+    return result_json
 
 
-def load_main_node(symbol: dict):
+def collect_main_node(symbol: dict, libs: List[str]):
+    """walks the library tree of the api index, registering every library name exactly once (in tree order)"""
     name = symbol['lib']
-    dl(url_for_module(name), name)
+    if name not in handled:
+        handled.append(name)
+        libs.append(name)
     if "nodes" in symbol:
         for sub_node in symbol["nodes"]:
-            load_main_node(sub_node)
+            collect_main_node(sub_node, libs)
 
 
-def load_entrypoint():
-    json_result = dl(BASE_API_URL, "api-index")
+def load_entrypoint(jobs: int = DEFAULT_JOBS):
+    json_result = dl(host + API_INDEX_PATH, "api-index")
 
+    libs = []
     for symbol in json_result["symbols"]:
-        load_main_node(symbol)
+        collect_main_node(symbol, libs)
+    map_concurrently(lambda name: fetch(url_for_module(name), name, parse=False), libs, jobs)
+    save_manifest()
+
+
+def count_results():
+    PROFILE.count('libraries changed', len(changed))
+    PROFILE.count('libraries unchanged', len(unchanged))
+    PROFILE.count('libraries failed', len(failed))
+
+
+def download(args, base_url: str, target_directory: str, object_store: ObjectStore = None):
+    configure(args.jobs, base_url, target_directory, (DEFAULT_TIMEOUT[0], args.timeout), args.retries, object_store,
+              args.compress)
+    if args.force:
+        manifest.clear()
+    with PROFILE.phase('download'):
+        load_entrypoint(args.jobs)
+    print_report()
+    count_results()
+
+
+def print_report():
+    print("\n%d changed, %d unchanged, %d failed" % (len(changed), len(unchanged), len(failed)))
+    for name in sorted(changed):
+        print("  changed: " + name)
+    for name in sorted(failed):
+        print("  failed:  " + name)
 
 
 if __name__ == "__main__":
-    print("This script will download the latest UI5 API information, hang tight...")
-    load_entrypoint()
+    parser = argparse.ArgumentParser(description="Download the latest UI5 API information, or that of given versions")
+    parser.add_argument("--jobs", "-j", type=int, default=DEFAULT_JOBS,
+                        help="number of libraries to download at the same time (default: %(default)s)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT[1],
+                        help="seconds to wait for a server response before retrying (default: %(default)s)")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES,
+                        help="how often to retry a failed request, with exponential backoff (default: %(default)s)")
+    parser.add_argument("--base-url", default=UI5_HOST,
+                        help="server to download from, e.g. a local stand-in (default: %(default)s)")
+    parser.add_argument("--versions", metavar="VERSION", nargs='+',
+                        help="download these UI5 versions (e.g. 1.71.0) into ../versions/VERSION/api/ instead of the "
+                             "latest one into ../api/, storing the files that are the same in several versions once")
+    parser.add_argument("--compress", choices=sorted(COMPRESSIONS),
+                        help="store the api files compressed (zstd needs `pip install zstandard`), ts_gen.py reads "
+                             "them all the same")
+    parser.add_argument("--force", action="store_true",
+                        help="download everything again, ignoring the validators in the manifest")
+    parser.add_argument("--report", metavar="FILE",
+                        help="write the download time of every library, and what changed, as json")
+    args = parser.parse_args()
+
+    print("This script will download the UI5 API information, hang tight...")
+    PROFILE.info.update({'script': 'download', 'jobs': args.jobs, 'base_url': args.base_url, 'force': args.force,
+                         'versions': args.versions, 'compress': args.compress})
+    if args.versions is None:
+        download(args, args.base_url, API_DIRECTORY)
+    else:
+        store = ObjectStore()
+        for version in args.versions:
+            print("\nVersion " + version)
+            target_directory = version_directory(version, 'api')
+            os.makedirs(target_directory, exist_ok=True)
+            download(args, args.base_url.rstrip('/') + '/' + version, target_directory, store)
+    if args.report is not None:
+        PROFILE.save(args.report)
     print("\nAll done!")
-    time.sleep(2)
+    if sys.stdout.isatty():
+        time.sleep(2)  # keeps the window open for a moment when the script was started with a double-click
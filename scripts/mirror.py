@@ -0,0 +1,26 @@
+import argparse
+import sys
+
+from scripts.ts_gen import API_DIRECTORY, EXTERNAL_TYPINGS, TS_DIRECTORY
+from scripts.util.fetching import OfflineError
+from scripts.util.mirror import pack_mirror
+from scripts.util.source_cache import CACHE_DIRECTORY
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Pack everything ts_gen.py downloads into a mirror, for building with ts_gen.py --offline MIRROR. "
+                    "Run download.py and ts_gen.py with network access first.")
+    parser.add_argument("target", help="a directory, or an archive ending with .zip, .tar.gz, .tgz or .tar")
+    args = parser.parse_args()
+
+    print("Packing the offline mirror...", end="", flush=True)
+    try:
+        path = pack_mirror(args.target, API_DIRECTORY, CACHE_DIRECTORY,
+                           [TS_DIRECTORY + file_name for _, file_name in EXTERNAL_TYPINGS])
+    except OfflineError as e:
+        print("\nCannot pack the mirror, run download.py and ts_gen.py first. These files are missing:")
+        for path in e.missing:
+            print("  " + path)
+        sys.exit(1)
+    print("Done! " + path)
@@ -1,43 +1,213 @@
 # https://www.typescriptlang.org/docs/handbook/declaration-files/introduction.html
-import json
+import argparse
+import gc
 import os
+import sys
 import time
+from typing import *
 
-from scripts.util.ts_structures import Declaration
+from scripts.util.api_store import api_files, version_directory
+from scripts.util.build_state import FullBuildNeeded, build_incrementally, generator_fingerprint, input_hashes, \
+    record_build
+from scripts.util.loading import DEFAULT_JOBS, DigestCache, load_libraries
+from scripts.util.mirror import MIRROR_API, MIRROR_EXTERNAL, MIRROR_SOURCES, check_mirror, open_mirror
+from scripts.util.profiling import PROFILE, profiler
+from scripts.util.snapshot import SNAPSHOT_FILE, load_snapshot, save_snapshot
+from scripts.util.source_cache import SourceCache
+from scripts.util.watching import DEFAULT_DEBOUNCE, DEFAULT_INTERVAL, Watcher
+from scripts.util import comment, fetching, ts_structures
+from scripts.util.ts_structures import Declaration, write_if_changed
 
 import requests
-import requests_cache
-requests_cache.install_cache(allowable_codes=(200, 404))
 
 
-def dl(url: str, file_name: str):
-    req = requests.get(url)
+API_DIRECTORY = "../api/"
+TS_DIRECTORY = "../ts/"
+EXTERNAL_TYPINGS = [
+    ("https://raw.githubusercontent.com/DefinitelyTyped/DefinitelyTyped/master/types/jquery/v2/index.d.ts",
+     "external.jQuery.d.ts"),
+]
 
+
+def dl(url: str, ts_directory: str, file_name: str):
     try:
-        with open('../ts/' + file_name, 'w') as f:
-            f.write(req.text.replace("declare var jQuery:", "declare var jQueryStatic:"))
-    except ValueError:
+        req = fetching.make_session(1).get(url, timeout=fetching.DEFAULT_TIMEOUT)
+        req.raise_for_status()
+    except requests.RequestException:
         print("Cannot access " + url)
+        return
+    write_if_changed(ts_directory + file_name, req.text.replace("declare var jQuery:", "declare var jQueryStatic:"))
 
 
-if __name__ == "__main__":
-    print("This script will generate your typescript declarations, hang tight...")
-    decl = Declaration()
-    for root, dirs, files in os.walk("../api/"):
-        for file in files:
-            if '.json' in file and 'api-index' not in file:
-                lib_name = file[:len('.json')*-1]
-                with open(os.path.join(root, file), encoding="utf8") as f:
-                    decl.load(json.load(f), lib_name)
-    print("Done loading!")
-    print("Now cleaning up... ", end="", flush=True)
-    decl.clean_up()
-    print("Done!")
-    print("Now writing...", end="", flush=True)
-    decl.save_to("../ts/")
-    print("Done!")
+def copy_external(mirror: str, ts_directory: str, file_name: str):
+    with open(mirror + MIRROR_EXTERNAL + file_name, encoding="utf8") as f:
+        write_if_changed(ts_directory + file_name, f.read())
+
+
+def print_source_counts(counts: Optional[Dict[str, int]]):
+    if counts is not None:
+        print("Source code for line numbers: %d cached, %d downloaded, %d not found, %d failed" % (
+            counts['hit'], counts['miss'], counts['404'], counts['failed']))
+
+
+def print_unresolved(decl: Declaration):
+    report = decl.symbols.report()
+    if report is not None:
+        print(report)
+
+
+def print_description_counts():
+    report = comment.DESCRIPTIONS.report()
+    if report is not None:
+        print(report)
+
+
+def output_settings() -> dict:
+    return {'source_links': ts_structures.ENABLE_SOURCE_LINKS_WITH_LINE_NUMBERS, 'pretty_print': comment.ENABLE_PRETTY_PRINT}
+
+
+def build(args, api_directory: str, ts_directory: str, snapshot: Optional[str], incremental: bool,
+          cache: Optional[DigestCache] = None):
+    """with a cache, the libraries whose content was put into it before (e.g. by another version) are not decoded again"""
+    fingerprint = generator_fingerprint(output_settings())
+    result = None
+    if incremental:
+        print("Looking for changed libraries... ", end="", flush=True)
+        try:
+            result = build_incrementally(api_directory, ts_directory, fingerprint, args.jobs, args.fetch_jobs, cache,
+                                         args.write_jobs)
+        except FullBuildNeeded as e:
+            print(str(e) + ", generating everything")
+        else:
+            written, deleted = result
+            print("Done! %d files updated, %d deleted" % (len(written), len(deleted)))
+            print_description_counts()
+    if result is None:
+        inputs = input_hashes(api_directory)
+        decl = None
+        if snapshot is not None:
+            decl = load_snapshot(snapshot, inputs)
+            print("Loaded the snapshot!" if decl is not None else "The snapshot is missing or outdated, loading everything")
+        if decl is None:
+            decl = Declaration()
+            load_libraries(decl, api_files(api_directory), args.jobs, cache)
+            print("Done loading!")
+            print("Now cleaning up... ", end="", flush=True)
+            decl.clean_up()
+            print("Done!")
+            if snapshot is not None:
+                save_snapshot(decl, snapshot, inputs)
+        print_unresolved(decl)
+        print_source_counts(decl.prefetch_sources(args.fetch_jobs))
+        print("Now writing...", end="", flush=True)
+        decl.save_to(ts_directory, args.write_jobs)
+        record_build(decl, ts_directory, fingerprint, inputs)
+        print("Done!")
+        print_description_counts()
+
+
+def targets(args, api_directory: str) -> List[Tuple[str, str, Optional[str]]]:
+    """(api directory, declaration directory, snapshot file) of every build this run makes"""
+    if args.versions is None:
+        return [(api_directory, TS_DIRECTORY, args.snapshot)]
+    result = []
+    for version in args.versions:
+        snapshot = None if args.snapshot is None else version_directory(version, '.cache') + os.path.basename(args.snapshot)
+        result.append((version_directory(version, 'api'), version_directory(version, 'ts'), snapshot))
+    return result
+
+
+def generate(args):
+    mirror = None
+    builds = []
+    try:
+        api_directory = API_DIRECTORY
+        if args.offline is not None:
+            mirror = open_mirror(args.offline)
+            check_mirror(mirror, [file_name for _, file_name in EXTERNAL_TYPINGS])
+            api_directory = mirror + MIRROR_API
+            ts_structures.SOURCE_CACHE = SourceCache(mirror + MIRROR_SOURCES, offline=True)
+        builds = targets(args, api_directory)
+        # versions share the digests of their equal api files, and the descriptions (see `DescriptionStore`)
+        cache = DigestCache() if args.watch or len(builds) > 1 else None
+        for api_directory, ts_directory, snapshot in builds:
+            if args.versions is not None:
+                print("\nGenerating " + ts_directory)
+                os.makedirs(ts_directory, exist_ok=True)
+            build(args, api_directory, ts_directory, snapshot, args.incremental, cache)
+            if len(builds) > 1:
+                gc.collect()  # the model of this version has cycles, free it before building the next one
+                gc.freeze()  # and don't scan what is kept for the next versions (digests, descriptions) ever again
+    except fetching.OfflineError as e:
+        print("\nCannot build offline, these files are missing from the mirror:")
+        for path in e.missing:
+            print("  " + path)
+        sys.exit(1)
+    PROFILE.count('descriptions marked up', comment.DESCRIPTIONS.misses)
+    PROFILE.count('descriptions reused', comment.DESCRIPTIONS.hits)
     print("Getting additional types...", end="", flush=True)
-    dl("https://raw.githubusercontent.com/DefinitelyTyped/DefinitelyTyped/master/types/jquery/v2/index.d.ts", "external.jQuery.d.ts")
+    with PROFILE.phase('external'):
+        for _, ts_directory, _ in builds:
+            for url, file_name in EXTERNAL_TYPINGS:
+                if mirror is None:
+                    dl(url, ts_directory, file_name)
+                else:
+                    copy_external(mirror, ts_directory, file_name)
     print("Done!")
+    if args.watch:
+        api_directory, ts_directory, snapshot = builds[0]
+        print(PROFILE.summary())
+        # the generator code stays loaded, so changes to it need a restart
+        Watcher(api_directory, lambda changed: build(args, api_directory, ts_directory, snapshot, True, cache),
+                args.watch_interval, args.watch_debounce).run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate typescript declarations from the downloaded UI5 API")
+    parser.add_argument("--incremental", "-i", action="store_true",
+                        help="only re-generate the files whose input libraries changed since the last run")
+    parser.add_argument("--jobs", "-j", type=int, default=DEFAULT_JOBS,
+                        help="number of processes loading api files in parallel (default: %(default)s)")
+    parser.add_argument("--write-jobs", type=int, default=1,
+                        help="number of processes writing declaration files in parallel: each file's namespace is "
+                             "sent to them, which only pays off with several cores to spare (default: %(default)s)")
+    parser.add_argument("--fetch-jobs", type=int, default=fetching.DEFAULT_JOBS,
+                        help="number of source files to download at the same time (default: %(default)s)")
+    parser.add_argument("--offline", metavar="MIRROR",
+                        help="do not use the network, but a mirror directory or archive created by mirror.py")
+    parser.add_argument("--snapshot", metavar="FILE", nargs='?', const=SNAPSHOT_FILE,
+                        help="build from the model stored by a previous run with this option (if the api files are "
+                             "still the same), or store it after loading (default file: %(const)s)")
+    parser.add_argument("--versions", metavar="VERSION", nargs='+',
+                        help="generate these UI5 versions, downloaded with download.py --versions, from "
+                             "../versions/VERSION/api/ into ../versions/VERSION/ts/, reusing what they have in common")
+    parser.add_argument("--watch", "-w", action="store_true",
+                        help="keep running after the build, and re-generate the files of every library that changes "
+                             "(only decoding the changed api files again)")
+    parser.add_argument("--watch-interval", type=float, default=DEFAULT_INTERVAL, metavar="SECONDS",
+                        help="how often to look for changed api files when watching (default: %(default)s)")
+    parser.add_argument("--watch-debounce", type=float, default=DEFAULT_DEBOUNCE, metavar="SECONDS",
+                        help="how long changed api files have to stay the same before re-generating "
+                             "(default: %(default)s)")
+    parser.add_argument("--report", metavar="FILE",
+                        help="write the timings of all phases, libraries and files, and what was done, as json")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="profile the run: with pyinstrument into a .html file, otherwise with cProfile "
+                             "(this only covers the main process, use --jobs 1 to include everything)")
+    args = parser.parse_args()
+    if args.versions is not None and (args.offline is not None or args.watch):
+        parser.error("--versions cannot be combined with --offline or --watch")
+
+    print("This script will generate your typescript declarations, hang tight...")
+    PROFILE.info.update({'script': 'ts_gen', 'incremental': args.incremental, 'offline': args.offline is not None,
+                         'snapshot': args.snapshot is not None, 'watch': args.watch, 'versions': args.versions,
+                         'jobs': args.jobs, 'write_jobs': args.write_jobs, 'fetch_jobs': args.fetch_jobs,
+                         **output_settings()})
+    with profiler(args.profile):
+        generate(args)
+    print(PROFILE.summary())
+    if args.report is not None:
+        PROFILE.save(args.report)
     print("\nAll done!")
-    time.sleep(2)
+    if sys.stdout.isatty():
+        time.sleep(2)  # keeps the window open for a moment when the script was started with a double-click
@@ -0,0 +1,130 @@
+import gzip
+import hashlib
+import io
+import os
+import shutil
+from typing import *
+
+
+API_INDEX_FILE = 'api-index.json'
+MANIFEST_FILE = 'manifest.json'  # written by download.py, see `download.save_manifest`
+VERSIONS_DIRECTORY = "../versions/"  # the api files and declarations of specific UI5 versions, see `version_directory`
+OBJECTS_DIRECTORY = VERSIONS_DIRECTORY + "objects/"  # the api files of all versions by their content, see `ObjectStore`
+# the api files can be stored compressed, each format has its own suffix, see `open_api_file`
+COMPRESSIONS = {'gzip': '.json.gz', 'zstd': '.json.zst'}  # needs `pip install zstandard`
+API_SUFFIXES = ('.json', *COMPRESSIONS.values())
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 10
+
+
+def api_suffix(file_name: str) -> Optional[str]:
+    for suffix in API_SUFFIXES:
+        if file_name.endswith(suffix):
+            return suffix
+    return None
+
+
+def api_files(directory: str) -> List[Tuple[str, str]]:
+    """
+    (lib_name, path) of all downloaded library api files, compressed or not,
+    sorted by library name so that builds are reproducible
+    """
+    result = []
+    for root, dirs, files in os.walk(directory):
+        for file in files:
+            suffix = api_suffix(file)
+            if suffix is not None and file[:-len(suffix)] + '.json' not in (API_INDEX_FILE, MANIFEST_FILE):
+                result.append((file[:-len(suffix)], os.path.join(root, file)))
+    return sorted(result)
+
+
+def api_path(directory: str, name: str) -> Optional[str]:
+    """the path of the api file `name` (e.g. sap.m or api-index) in `directory`, whichever way it is stored"""
+    for suffix in API_SUFFIXES:
+        if os.path.isfile(directory + name + suffix):
+            return directory + name + suffix
+    return None
+
+
+def compress(data: bytes, compression: Optional[str]) -> bytes:
+    """the json `data` stored in the given format (None for plain json), always the same bytes for the same data"""
+    if compression is None:
+        return data
+    if compression == 'gzip':
+        return gzip.compress(data, GZIP_LEVEL, mtime=0)
+    import zstandard
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+
+
+def open_api_file(path: str) -> TextIO:
+    """reads the json of an api file as text, decompressing it on the fly"""
+    if path.endswith(COMPRESSIONS['gzip']):
+        return gzip.open(path, 'rt', encoding='utf8')
+    if path.endswith(COMPRESSIONS['zstd']):
+        import zstandard
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, 'rb')), encoding='utf8')
+    return open(path, encoding='utf8')
+
+
+def read_api_file(path: str) -> bytes:
+    """the json of an api file, decompressed"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if path.endswith(COMPRESSIONS['gzip']):
+        return gzip.decompress(data)
+    if path.endswith(COMPRESSIONS['zstd']):
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(data)
+    return data
+
+
+def file_hash(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def version_directory(version: str, sub_directory: str) -> str:
+    """e.g. ../versions/1.71.0/api/ for the api files of that version, ../versions/1.71.0/ts/ for its declarations"""
+    return VERSIONS_DIRECTORY + version + '/' + sub_directory + '/'
+
+
+class ObjectStore:
+    """
+    the api files of all versions by the sha256 of their content, so that a file that is the same in several versions
+    is stored once: the version directories only contain hard links to these objects (or copies, where the file
+    system cannot link). Compressed files are stored apart from uncompressed ones, by their suffix.
+    As all links share the content, a file in a version directory must never be written to in place, only replaced.
+    """
+    directory: str
+
+    def __init__(self, directory: str = OBJECTS_DIRECTORY):
+        self.directory = directory
+
+    def path_of(self, sha256: str, suffix: str = '.json') -> str:
+        return self.directory + sha256[:2] + '/' + sha256 + suffix
+
+    def put(self, data: bytes, sha256: str, suffix: str = '.json') -> bool:
+        """stores the content unless it is there already, returns whether it was new"""
+        path = self.path_of(sha256, suffix)
+        if os.path.isfile(path):
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(path + '.tmp', path)
+        return True
+
+    def link(self, data: bytes, sha256: str, path: str) -> bool:
+        """
+        makes `path` have the content `data`, stored the way the suffix of `path` says, with `sha256` being that of
+        the uncompressed content. Returns whether that content was new to the store.
+        """
+        suffix = api_suffix(path)
+        new = self.put(data, sha256, suffix)
+        if os.path.isfile(path):
+            os.remove(path)
+        try:
+            os.link(self.path_of(sha256, suffix), path)
+        except OSError:
+            shutil.copyfile(self.path_of(sha256, suffix), path)
+        return new
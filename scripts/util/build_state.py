@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+from typing import *
+
+from . import fetching
+from .api_store import api_files, file_hash
+from .loading import DEFAULT_JOBS, DigestCache, load_libraries
+from .ts_structures import Declaration
+
+
+STATE_FILE = '.build-state.json'
+
+
+class FullBuildNeeded(Exception):
+    """an incremental build cannot reproduce what a full build would write, the message says why"""
+
+
+def generator_fingerprint(settings: dict) -> str:
+    """changes whenever the generator code or its output settings change - which invalidates every generated file"""
+    h = hashlib.sha256(json.dumps(settings, sort_keys=True).encode('utf8'))
+    util_directory = os.path.dirname(os.path.abspath(__file__))
+    for name in sorted(os.listdir(util_directory)):
+        if name.endswith('.py'):
+            with open(os.path.join(util_directory, name), 'rb') as f:
+                h.update(f.read())
+    return h.hexdigest()
+
+
+class BuildState:
+    """what the last build generated from which inputs, stored next to the generated files"""
+    fingerprint: str
+    inputs: Dict[str, str]  # lib -> sha256 of its api.json
+    outputs: Dict[str, List[str]]  # .d.ts file name -> the libs it was generated from
+    symbols: Dict[str, List[Tuple[str, str]]]  # lib -> (full name, kind) of the symbols it declares
+    symbol_digest: str  # of the symbol table all files were generated with
+
+    def __init__(self, fingerprint: str = '', inputs: Dict[str, str] = None, outputs: Dict[str, List[str]] = None,
+                 symbols: Dict[str, List[Tuple[str, str]]] = None, symbol_digest: str = ''):
+        self.fingerprint = fingerprint
+        self.inputs = inputs or {}
+        self.outputs = outputs or {}
+        self.symbols = symbols or {}
+        self.symbol_digest = symbol_digest
+
+    @staticmethod
+    def load(directory: str) -> 'BuildState':
+        try:
+            with open(directory + STATE_FILE, encoding='utf8') as f:
+                data = json.load(f)
+            return BuildState(data['fingerprint'], data['inputs'], data['outputs'], data['symbols'],
+                              data['symbol_digest'])
+        except (OSError, ValueError, KeyError):
+            return BuildState()
+
+    def save(self, directory: str):
+        with open(directory + STATE_FILE, 'w', encoding='utf8') as f:
+            json.dump({'fingerprint': self.fingerprint, 'inputs': self.inputs, 'outputs': self.outputs,
+                       'symbols': self.symbols, 'symbol_digest': self.symbol_digest}, f, indent=1, sort_keys=True)
+
+
+def input_hashes(api_directory: str) -> Dict[str, str]:
+    return {lib: file_hash(path) for lib, path in api_files(api_directory)}
+
+
+def load_declaration(libs: List[Tuple[str, str]], jobs: int = DEFAULT_JOBS,
+                     other_declared: Dict[str, List[Tuple[str, str]]] = None,
+                     cache: Optional[DigestCache] = None) -> Declaration:
+    """loads and cleans up the given (lib_name, path) pairs, in the given order"""
+    decl = Declaration()
+    load_libraries(decl, libs, jobs, cache)
+    decl.clean_up(other_declared)
+    return decl
+
+
+def delete_outputs(directory: str, file_names: Iterable[str]) -> List[str]:
+    deleted = []
+    for file_name in file_names:
+        if os.path.isfile(directory + file_name):
+            os.remove(directory + file_name)
+            deleted.append(file_name)
+    return deleted
+
+
+def record_build(decl: Declaration, target_directory: str, fingerprint: str, inputs: Dict[str, str]) -> List[str]:
+    """stores the state of a full build, deleting files of the previous build that are not generated anymore"""
+    old = BuildState.load(target_directory)
+    outputs = {file_name: sorted(ns.libs) for file_name, ns in decl.files()}
+    deleted = delete_outputs(target_directory, [f for f in old.outputs if f not in outputs])
+    BuildState(fingerprint, inputs, outputs, decl.declared, decl.symbols.digest()).save(target_directory)
+    return deleted
+
+
+def build_incrementally(api_directory: str, target_directory: str, fingerprint: str, jobs: int = DEFAULT_JOBS,
+                        fetch_jobs: int = fetching.DEFAULT_JOBS,
+                        cache: Optional[DigestCache] = None, write_jobs: int = 1) -> Tuple[List[str], List[str]]:
+    """
+    re-generates only the files that are generated from changed libraries.
+    A file's content only depends on the libraries that contributed symbols to its namespace,
+    and on the symbol table of all libraries - which is rebuilt from the stored symbols of the libraries not loaded.
+    So loading just these libraries (in the usual order) reproduces exactly what a full build would write,
+    unless the symbol table changed: that can change any file, so it needs a full build.
+    Returns (written files, deleted files), or raises `FullBuildNeeded` if a full build is needed instead.
+    """
+    old = BuildState.load(target_directory)
+    if old.fingerprint == '':
+        raise FullBuildNeeded("no previous build found")
+    if old.fingerprint != fingerprint:
+        raise FullBuildNeeded("the generator or its settings changed since the previous build")
+    paths = dict(api_files(api_directory))
+    inputs = {lib: file_hash(path) for lib, path in paths.items()}
+    dirty = {lib for lib in inputs if old.inputs.get(lib) != inputs[lib]} | (old.inputs.keys() - inputs.keys())
+    if len(dirty) == 0:
+        return [], []
+
+    affected = {file_name for file_name, libs in old.outputs.items() if not dirty.isdisjoint(libs)}
+    needed = dirty & inputs.keys()
+    for file_name in affected:
+        needed.update(lib for lib in old.outputs[file_name] if lib in inputs)
+    while True:
+        unknown = sorted(lib for lib in inputs.keys() - needed if lib not in old.symbols)
+        if len(unknown) > 0:
+            raise FullBuildNeeded("the previous build did not declare the symbols of " + ", ".join(unknown))
+        other_declared = {lib: old.symbols[lib] for lib in inputs.keys() - needed}
+        decl = load_declaration([(lib, paths[lib]) for lib in sorted(needed)], jobs, other_declared, cache)
+        produced = {file_name: ns for file_name, ns in decl.files()}
+        # a changed library might now contribute to a file that is also fed by libraries we did not load yet
+        missing = set()
+        for file_name in produced:
+            missing.update(lib for lib in old.outputs.get(file_name, []) if lib in inputs and lib not in needed)
+        if len(missing) == 0:
+            break
+        needed |= missing
+    if decl.symbols.digest() != old.symbol_digest:
+        raise FullBuildNeeded("the changed libraries add or remove symbols, which can change any file")
+
+    decl.prefetch_sources(fetch_jobs)
+    written = decl.save_to(target_directory, write_jobs)
+    deleted = delete_outputs(target_directory, [f for f in affected if f not in produced])
+    outputs = {f: libs for f, libs in old.outputs.items() if f not in affected}
+    outputs.update({file_name: sorted(ns.libs) for file_name, ns in produced.items()})
+    symbols = {**other_declared, **decl.declared}
+    BuildState(fingerprint, inputs, outputs, symbols, old.symbol_digest).save(target_directory)
+    return written, deleted
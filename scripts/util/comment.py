@@ -1,18 +1,82 @@
 import re
+import time
 from typing import *
 
-from bs4 import BeautifulSoup
+from .html_printer import pretty_print_html
 
 
-orig_prettify = BeautifulSoup.prettify
-r = re.compile(r'^(\s*)', re.MULTILINE)
-def prettify(self, encoding=None, formatter="minimal", indent_width=4):
-    return r.sub(r'\1' * indent_width, orig_prettify(self, encoding, formatter))
-BeautifulSoup.prettify = prettify
+# a doc link to a symbol (1) or one of its methods (2), with its link text (3)
+ANY_CROSS_LINK = re.compile(r"<a[^>]* href=\"#/api/([a-zA-Z0-9.]+)(?:/methods/([a-zA-Z0-9.]+))?\"[^>]*>([^<>]+)</a>")
+DOCS_URL = "https://sapui5.netweaver.ondemand.com/#/api/"
+ENABLE_PRETTY_PRINT = True  # indent the html of the descriptions, so that it is readable in the IDE
 
 
-CROSS_LINK = re.compile(r"<a[^>]* href=\"#/api/([a-zA-Z0-9.]+)\"[^>]*>([^<>]+)</a>")
-CROSS_LINK_M = re.compile(r"<a[^>]* href=\"#/api/([a-zA-Z0-9.]+)/methods/([a-zA-Z0-9.]+)\"[^>]*>([^<>]+)</a>")
+class MarkedUp(NamedTuple):
+    text: str
+    links: Tuple[Tuple[str, bool], ...]  # (target, whether it was a known symbol) of every doc link in the description
+
+
+class DescriptionStore:
+    """
+    the marked up descriptions by their text, so that each distinct description is only marked up once:
+    many of them repeat verbatim, e.g. those of the generated attach/detach/fire methods of events.
+    The links in them depend on the symbol table, but only on whether their targets are symbols, so an entry is
+    reused with any symbol table that knows the same of its targets - e.g. after a rebuild, or for another version.
+    """
+    marked_up: Dict[str, MarkedUp]  # description -> its marked up text
+    added: List[str]  # the descriptions marked up since `take_added`
+    hits: int
+    misses: int
+    seconds: float  # spent on marking up the misses
+
+    def __init__(self):
+        self.marked_up = {}
+        self.added = []
+        self.hits = 0
+        self.misses = 0
+        self.seconds = 0.0
+
+    def markup(self, comment: 'Comment', text: str) -> str:
+        entry = self.marked_up.get(text)
+        if entry is not None and all(comment.is_symbol(target) == known for target, known in entry.links):
+            self.hits += 1
+            return entry.text
+        start = time.perf_counter()
+        links = {}
+        entry = self.marked_up[text] = MarkedUp(comment.mark_up_links(text, links), tuple(links.items()))
+        self.added.append(text)
+        self.seconds += time.perf_counter() - start
+        self.misses += 1
+        return entry.text
+
+    def take_added(self) -> Dict[str, MarkedUp]:
+        """the entries marked up since the last call, e.g. to hand them from a worker process to the main one"""
+        added = {text: self.marked_up[text] for text in self.added}
+        self.added = []
+        return added
+
+    def clear(self):
+        self.__init__()
+
+    def counts(self) -> Tuple[int, int, float]:
+        return self.hits, self.misses, self.seconds
+
+    def add_counts(self, counts: Tuple[int, int, float]):
+        """adds the counts of another store, e.g. of a worker process"""
+        self.hits += counts[0]
+        self.misses += counts[1]
+        self.seconds += counts[2]
+
+    def report(self) -> Optional[str]:
+        looked_up = self.hits + self.misses
+        if looked_up == 0:
+            return None
+        saved = 0.0 if self.misses == 0 else self.hits * self.seconds / self.misses  # assuming an average description
+        return "Descriptions: %d marked up, %d reused (%.0f%%), saving about %.2fs" % (
+            self.misses, self.hits, 100 * self.hits / looked_up, saved)
+
+
+DESCRIPTIONS = DescriptionStore()
 
 
 class Comment:
@@ -24,6 +88,7 @@ class Comment:
     ux_guide: Optional[Tuple[str, str]]  # (url, displayString)
     lib: Optional[str]
     source_code_line: Optional[int]
+    symbols: Optional[Container[str]]  # symbol names, links to other targets are not turned into {@link}s
 
     def __init__(self, text: str, uri: str = None, docs_sub_uri: str = ''):
         self.text = text
@@ -34,54 +99,62 @@ class Comment:
         self.ux_guide = None
         self.lib = None
         self.source_code_line = None
+        self.symbols = None
 
     def write(self, f: 'TextIO', indent: str):
+        """writes the comment in one go: the text is put together first, and then prefixed line by line at once"""
         if self.text is None or len(self.text) == 0:
             return
-        pretty_text = self.pretty_print(self.clean_text())
+        parts = [self.markup(self.text)]
+        for (name, description) in self.parameters:
+            # parameter descriptions keep their links as they are
+            parts.append("@param " + name + "  " + description.replace('<pre>', '\n<pre>'))
+        if len(self.parameters) > 0:
+            parts.append('')
         if self.uri is not None:
-            pretty_text += '\nOpen <a href="https://sapui5.netweaver.ondemand.com/#/api/' + self.uri + self.docs_sub_uri + '">the docs</a>'
+            parts.append('Open <a href="' + DOCS_URL + self.uri + self.docs_sub_uri + '">the docs</a>')
         if self.has_sample:
-            pretty_text += '\nOpen <a href="https://sapui5.netweaver.ondemand.com/#/entity/' + self.uri + '">examples</a>'
+            parts.append('Open <a href="https://sapui5.netweaver.ondemand.com/#/entity/' + self.uri + '">examples</a>')
         if self.ux_guide is not None:
-            pretty_text += '\nOpen <a href="' + self.ux_guide[0] + '">UX Guidelines for "' + self.ux_guide[1] + '"</a>'
+            parts.append('Open <a href="' + self.ux_guide[0] + '">UX Guidelines for "' + self.ux_guide[1] + '"</a>')
         if self.lib is not None and self.uri is not None:
-            pretty_text += '\nOpen <a href="https://github.com/SAP/openui5/blob/master/src/' + self.lib + '/src/' + self.uri.replace('.', '/') + '.js'
-            if self.source_code_line is not None:
-                pretty_text += '#L' + str(self.source_code_line)
-            pretty_text += '">source code</a>'
-        f.write(indent + "/**\n")
-        f.write('\n'.join([indent + " * " + line for line in pretty_text.split('\n')]) + "\n")
-        f.write(indent + " */\n")
-
-    def clean_text(self) -> str:
-        text = self.text
-        text = CROSS_LINK.sub(r"[\2]{@link \1}", text)
-        text = CROSS_LINK_M.sub(r"[\3]{@link \1.\2}", text)
-        if len(self.parameters) > 0:
-            text += "\n"
-        for (name, description) in self.parameters:
-            text += "@param " + name + "  " + description + "\n"
-        text = text.replace('<pre>', '\n<pre>')  # to fix WebStorm bug of not properly displyeing these
-        return text
+            parts.append('Open <a href="https://github.com/SAP/openui5/blob/master/src/' + self.lib + '/src/' +
+                         self.uri.replace('.', '/') + '.js' +
+                         ('' if self.source_code_line is None else '#L' + str(self.source_code_line)) +
+                         '">source code</a>')
+        line_break = "\n" + indent + " * "
+        f.write(indent + "/**" + line_break + "\n".join(parts).replace("\n", line_break) + "\n" + indent + " */\n")
+
+    def markup(self, text: str) -> str:
+        """turns the doc links in `text` into {@link}s, and puts each <pre> on its own line"""
+        if '<' not in text:
+            return text  # most descriptions are plain text
+        return DESCRIPTIONS.markup(self, text)
+
+    def mark_up_links(self, text: str, links: Optional[Dict[str, bool]] = None) -> str:
+        """`markup`, without looking into the `DESCRIPTIONS` first, noting the link targets down in `links`"""
+        text = ANY_CROSS_LINK.sub(lambda m: self.link(m.group(3), m.group(1), m.group(2), links), text)
+        if ENABLE_PRETTY_PRINT:
+            return self.pretty_print(text)  # also puts each <pre> on its own line
+        return text.replace('<pre>', '\n<pre>')  # to fix WebStorm bug of not properly displyeing these
+
+    def link(self, text: str, target: str, method: Optional[str] = None,
+             links: Optional[Dict[str, bool]] = None) -> str:
+        """a {@link} to the target symbol, or a link to its online docs if it is not part of these declarations"""
+        known = self.is_symbol(target)
+        if links is not None:
+            links[target] = known  # whether it was a symbol, see `MarkedUp`
+        if not known:
+            return '<a href="' + DOCS_URL + target + ('' if method is None else '/methods/' + method) + '">' + text + '</a>'
+        if method is not None:
+            target += '.' + method.split('.')[-1]  # static methods are linked with their full name
+        return '[' + text + ']{@link ' + target + '}'
+
+    def is_symbol(self, target: str) -> bool:
+        return self.symbols is None or target in self.symbols
 
     def pretty_print(self, text: str) -> str:
-        return text  # disabled, since it really impacts the performance and is not really needed
-
-        # Double curly brackets to avoid problems with .format()
-        stripped_markup = text.replace('{', '{{').replace('}', '}}')
-
-        soup = BeautifulSoup(stripped_markup, features="html.parser")
-        for img in soup.find_all("img"):
-            img.decompose()
-
-        unformatted_tag_list = []
-
-        for i, tag in enumerate(soup.find_all(['span', 'a', 'code'])):
-            unformatted_tag_list.append(str(tag))
-            tag.replace_with('{' + 'unformatted_tag_list[{0}]'.format(i) + '}')
-
-        return soup.prettify(formatter="minimal").format(unformatted_tag_list=unformatted_tag_list)
+        return pretty_print_html(text)
 
     def add_parameter(self, name: str, description: str):
         if description is not None and len(description) > 0:
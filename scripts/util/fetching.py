@@ -0,0 +1,50 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import *
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+DEFAULT_JOBS = 8
+DEFAULT_TIMEOUT = (5, 30)  # (connect, read) in seconds
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5  # waits 0.5s, 1s, 2s, ... between retries
+
+
+def make_session(pool_size: int = DEFAULT_JOBS, retries: int = DEFAULT_RETRIES,
+                 backoff: float = DEFAULT_BACKOFF) -> requests.Session:
+    """
+    a session that can be shared by all worker threads:
+    its connection pool keeps one connection per worker alive,
+    and transient failures (connection errors, 429 and 5xx) are retried with exponential backoff
+    """
+    retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=('GET', 'HEAD'), raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+def map_concurrently(function: Callable[[T], R], items: Iterable[T], jobs: int = DEFAULT_JOBS) -> List[R]:
+    """like map, but with at most `jobs` calls running at the same time. The result order matches the input order."""
+    items = list(items)
+    if jobs <= 1 or len(items) <= 1:
+        return [function(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(jobs, len(items))) as pool:
+        return list(pool.map(function, items))
+
+
+class OfflineError(Exception):
+    """things that would have to be downloaded, but are not available offline"""
+    missing: List[str]
+
+    def __init__(self, missing: List[str]):
+        Exception.__init__(self, str(len(missing)) + " files are missing from the offline mirror")
+        self.missing = missing
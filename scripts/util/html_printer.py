@@ -0,0 +1,116 @@
+import re
+from typing import *
+
+
+TAG = re.compile(r"<(/?)([a-zA-Z][a-zA-Z0-9]*)\b[^>]*>")
+PRE_END = re.compile(r"</pre\s*>", re.IGNORECASE)
+PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n\s*")
+INDENT_WIDTH = 4
+
+# tags that start on their own line and indent their content - everything else stays inline, like span, a and code
+BLOCK_TAGS = {'p', 'div', 'ul', 'ol', 'li', 'dl', 'dt', 'dd', 'table', 'thead', 'tbody', 'tfoot', 'tr', 'td', 'th',
+              'blockquote', 'section', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+# block tags without content
+STANDALONE_TAGS = {'hr'}
+# images cannot be shown in the IDE anyway
+DROPPED_TAGS = {'img'}
+# opening one of these ends the still open sibling that the ui5 docs often do not close, e.g. a <li> after a <li>
+IMPLICITLY_CLOSED = {'li': ('li',), 'p': ('p',), 'dt': ('dt', 'dd'), 'dd': ('dt', 'dd'), 'tr': ('tr', 'td', 'th'),
+                     'td': ('td', 'th'), 'th': ('td', 'th')}
+
+
+class HtmlPrinter:
+    """
+    formats the html of a description for reading it in the IDE, in a single pass over its tags without building a DOM:
+    block tags get their own lines and indent their content, inline tags stay in the text, images are dropped
+    and <pre> blocks are copied as they are.
+    """
+    html: str
+    lines: List[str]  # finished lines
+    line: List[str]  # the parts of the current line
+    open_tags: List[str]  # the block tags the current line is in
+
+    def __init__(self, html: str):
+        self.html = html
+        self.lines = []
+        self.line = []
+        self.open_tags = []
+
+    def print(self) -> str:
+        position = 0
+        while True:
+            match = TAG.search(self.html, position)
+            if match is None:
+                break
+            self.text(self.html[position:match.start()])
+            position = match.end()
+            closing, name = match.group(1) == '/', match.group(2).lower()
+            if name in DROPPED_TAGS:
+                continue
+            if name == 'pre' and not closing:
+                position = self.pre(match.start(), position)
+            elif name in BLOCK_TAGS:
+                if closing:
+                    self.close(name, match.group(0))
+                else:
+                    self.open(name, match.group(0))
+            elif name in STANDALONE_TAGS:
+                self.break_line()
+                self.lines.append(self.indent() + match.group(0))
+            else:
+                self.line.append(match.group(0))
+                if name == 'br':
+                    self.break_line()
+        self.text(self.html[position:])
+        self.break_line()
+        while len(self.lines) > 0 and self.lines[-1] == '':
+            self.lines.pop()
+        return '\n'.join(self.lines)
+
+    def indent(self) -> str:
+        return ' ' * (INDENT_WIDTH * len(self.open_tags))
+
+    def break_line(self):
+        content = ''.join(self.line).strip()
+        if len(content) > 0:
+            self.lines.append(self.indent() + content)
+        self.line = []
+
+    def text(self, text: str):
+        for i, paragraph in enumerate(PARAGRAPH_BREAK.split(text)):
+            if i > 0:
+                self.break_line()
+                if len(self.lines) > 0 and self.lines[-1] != '':
+                    self.lines.append('')
+            for j, part in enumerate(paragraph.split('\n')):
+                if j > 0:
+                    self.break_line()
+                self.line.append(part)
+
+    def open(self, name: str, tag: str):
+        self.break_line()
+        while len(self.open_tags) > 0 and self.open_tags[-1] in IMPLICITLY_CLOSED.get(name, ()):
+            self.open_tags.pop()
+        self.lines.append(self.indent() + tag)
+        self.open_tags.append(name)
+
+    def close(self, name: str, tag: str):
+        self.break_line()
+        if name in self.open_tags:
+            while self.open_tags.pop() != name:
+                pass
+        self.lines.append(self.indent() + tag)
+
+    def pre(self, start: int, position: int) -> int:
+        """copies the <pre> block starting at `start` unchanged, returns where it ends"""
+        self.break_line()
+        end = PRE_END.search(self.html, position)
+        end = len(self.html) if end is None else end.end()
+        self.lines.append(self.indent() + self.html[start:end])
+        return end
+
+
+def pretty_print_html(html: str) -> str:
+    if '<' not in html:
+        return html  # nothing to format
+    return HtmlPrinter(html).print()
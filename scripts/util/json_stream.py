@@ -0,0 +1,98 @@
+"""
+Reads the items of one big array in a json document one at a time, without ever holding the whole document.
+Only the top-level object is walked by hand, every value in it is decoded by the json module.
+"""
+import json
+from typing import *
+
+
+CHUNK_SIZE = 1 << 16
+DECODER = json.JSONDecoder()
+WHITESPACE = ' \t\n\r'
+
+
+class StreamReader:
+    """a read buffer over a text file that is refilled as needed, and dropped as soon as it has been consumed"""
+    f: TextIO
+    buffer: str
+    position: int
+    eof: bool
+
+    def __init__(self, f: TextIO):
+        self.f = f
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+
+    def fill(self, min_size: int = CHUNK_SIZE) -> bool:
+        """reads at least `min_size` more characters, unless the file ends. Returns whether anything was read."""
+        if self.eof:
+            return False
+        self.buffer = self.buffer[self.position:]
+        self.position = 0
+        read = 0
+        while read < min_size:
+            chunk = self.f.read(max(CHUNK_SIZE, min_size - read))
+            if len(chunk) == 0:
+                self.eof = True
+                break
+            self.buffer += chunk
+            read += len(chunk)
+        return read > 0
+
+    def peek(self) -> str:
+        """the next non-whitespace character, or '' at the end of the file"""
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in WHITESPACE:
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.fill():
+                return ''
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError("Expected '" + char + "' at offset " + str(self.position) + " of the json buffer")
+        self.position += 1
+
+    def value(self) -> Any:
+        """
+        decodes the next value. If it does not fit into the buffer, the buffer is grown by doubling its size,
+        so a value of size n costs O(n log n) decoding attempts at worst.
+        A value needs to be followed by at least one character, so that numbers are not cut off by the buffer end.
+        """
+        self.peek()
+        while True:
+            try:
+                result, end = DECODER.raw_decode(self.buffer, self.position)
+                if end < len(self.buffer) or self.eof:
+                    self.position = end
+                    return result
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.fill(max(CHUNK_SIZE, len(self.buffer) - self.position))
+
+
+def iter_array(f: TextIO, key: str) -> Iterator[Any]:
+    """yields the items of the array `key` of the top-level json object in `f`, one at a time"""
+    reader = StreamReader(f)
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        name = reader.value()
+        reader.expect(':')
+        if name == key:
+            reader.expect('[')
+            if reader.peek() == ']':
+                return
+            while True:
+                yield reader.value()
+                if reader.peek() == ']':
+                    return
+                reader.expect(',')
+        reader.value()  # skip everything else
+        if reader.peek() == '}':
+            raise KeyError(key)
+        reader.expect(',')
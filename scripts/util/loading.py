@@ -0,0 +1,131 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import *
+
+from .api_store import file_hash, open_api_file
+from .json_stream import iter_array
+from .profiling import PROFILE
+from .ts_structures import Declaration, digest_symbol
+
+
+DEFAULT_JOBS = os.cpu_count() or 1
+
+
+def read_symbols(path: str) -> Iterator[dict]:
+    """
+    the symbols of an api.json, decoded one at a time, so that the whole document is never in memory at once.
+    Compressed files are decompressed on the fly, by the worker process that decodes them.
+    """
+    with open_api_file(path) as f:
+        yield from iter_array(f, 'symbols')
+
+
+def digest_library(path: str) -> List[dict]:
+    """decodes one api.json and digests its symbols - this runs in a worker process"""
+    return [digest_symbol(s) for s in read_symbols(path)]
+
+
+def timed_digest_library(path: str) -> Tuple[float, List[dict]]:
+    start = time.perf_counter()
+    symbols = digest_library(path)
+    return time.perf_counter() - start, symbols
+
+
+def digest_in_order(paths: List[str], jobs: int) -> Iterator[Tuple[float, List[dict]]]:
+    """
+    (seconds spent decoding, digested symbols) of each of the given api files, in their order, decoded by worker
+    processes. Only twice as many libraries as there are workers are handed out at a time, so the digests that wait
+    for their turn stay bounded by that, instead of piling up until the last library is done.
+    """
+    with ProcessPoolExecutor(max_workers=min(jobs, len(paths))) as pool:
+        pending = deque()
+        for path in paths:
+            pending.append(pool.submit(timed_digest_library, path))
+            if len(pending) >= 2 * jobs:
+                yield pending.popleft().result()
+        while len(pending) > 0:
+            yield pending.popleft().result()
+
+
+class DigestCache:
+    """
+    the digested symbols of the api files that were loaded before, by their content, so that a generator that keeps
+    running (see `watching`) only decodes the files that changed, and one that builds several versions of the api
+    decodes the files that are the same in all of them only once
+    """
+    paths: Dict[str, Tuple[Tuple[int, int], str]]  # path -> ((modification time, size), sha256 of the content)
+    digests: Dict[str, List[dict]]  # sha256 of the content -> digested symbols
+
+    def __init__(self):
+        self.paths = {}
+        self.digests = {}
+
+    @staticmethod
+    def stamp(path: str) -> Tuple[int, int]:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def content_hash(self, path: str) -> str:
+        """hashes the file again only if it was touched since, which is much cheaper than decoding it"""
+        stamp = self.stamp(path)  # before reading, so that later changes are noticed
+        cached = self.paths.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        sha256 = file_hash(path)
+        self.paths[path] = (stamp, sha256)
+        return sha256
+
+    def digest_all(self, paths: List[str], jobs: int) -> Dict[str, Tuple[float, List[dict]]]:
+        """(seconds spent decoding, digested symbols) of the given api files, only decoding new contents"""
+        hashes = {path: self.content_hash(path) for path in paths}
+        missing = list({sha256: path for path, sha256 in hashes.items() if sha256 not in self.digests}.values())
+        if jobs <= 1 or len(missing) <= 1:
+            digested = map(timed_digest_library, missing)
+        else:
+            digested = digest_in_order(missing, jobs)
+        seconds = {}
+        for path, (time_taken, symbols) in zip(missing, digested):
+            self.digests[hashes[path]] = symbols
+            seconds[path] = time_taken
+        # forget the contents that no file has anymore
+        current = {sha256 for _, sha256 in self.paths.values()}
+        for sha256 in [sha256 for sha256 in self.digests if sha256 not in current]:
+            del self.digests[sha256]
+        return {path: (seconds.get(path, 0.0), self.digests[hashes[path]]) for path in paths}
+
+
+def load_libraries(decl: Declaration, libs: List[Tuple[str, str]], jobs: int = DEFAULT_JOBS,
+                   cache: Optional[DigestCache] = None):
+    """
+    loads the given (lib_name, path) pairs into `decl`.
+    With more than one job, the libraries are decoded and digested by worker processes,
+    but still merged into the declaration one after the other in the given order,
+    so that the result is exactly the same as loading them serially.
+    Each library's digest is merged as soon as it is its turn and dropped right after (see `digest_in_order`),
+    so besides the model only a few libraries' digests are in memory at a time.
+    With a cache, the digested symbols are kept there, and only the libraries that changed since are decoded again.
+    The time of each library is that of decoding it (in its worker) plus merging it.
+    """
+    with PROFILE.phase('load'):
+        PROFILE.count('libraries', len(libs))
+        if cache is not None:
+            digested_libs = cache.digest_all([path for _, path in libs], jobs)
+            for lib_name, path in libs:
+                seconds, symbols = digested_libs[path]
+                start = time.perf_counter()
+                decl.load_symbols(symbols, lib_name)
+                PROFILE.time_item('load', lib_name, seconds + time.perf_counter() - start)
+            return
+        if jobs <= 1 or len(libs) <= 1:
+            for lib_name, path in libs:
+                start = time.perf_counter()
+                decl.load_symbols(read_symbols(path), lib_name)
+                PROFILE.time_item('load', lib_name, time.perf_counter() - start)
+            return
+        digested_libs = digest_in_order([path for _, path in libs], jobs)
+        for (lib_name, _), (seconds, symbols) in zip(libs, digested_libs):
+            start = time.perf_counter()
+            decl.load_symbols(symbols, lib_name)
+            PROFILE.time_item('load', lib_name, seconds + time.perf_counter() - start)
@@ -0,0 +1,89 @@
+"""
+An offline mirror contains everything ts_gen.py would otherwise download:
+    api/        the api.json files, like ../api/
+    sources/    the OpenUI5 sources for line numbers, like the source cache in ../.cache/sources/
+    external/   additional typings, like ../ts/external.jQuery.d.ts
+It can be a directory, or a .zip / .tar.gz archive of such a directory.
+"""
+import atexit
+import os
+import shutil
+import tarfile
+import tempfile
+import zipfile
+from typing import *
+
+from .fetching import OfflineError
+
+
+MIRROR_API = "api/"
+MIRROR_SOURCES = "sources/"
+MIRROR_EXTERNAL = "external/"
+ARCHIVE_FORMATS = {'.zip': 'zip', '.tar.gz': 'gztar', '.tgz': 'gztar', '.tar': 'tar'}
+
+
+def archive_suffix(path: str) -> Optional[str]:
+    for suffix in ARCHIVE_FORMATS:
+        if path.endswith(suffix):
+            return suffix
+    return None
+
+
+def open_mirror(path: str) -> str:
+    """the mirror directory (with a trailing slash) - archives are unpacked into a temporary directory first"""
+    if os.path.isdir(path):
+        return os.path.join(path, '')
+    if not os.path.isfile(path) or archive_suffix(path) is None:
+        raise OfflineError([path])
+    directory = tempfile.mkdtemp(prefix='ui5_mirror_')
+    atexit.register(shutil.rmtree, directory, True)
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            archive.extractall(directory)
+    else:
+        with tarfile.open(path) as archive:
+            extract_tar(archive, directory)
+    return os.path.join(directory, '')
+
+
+def extract_tar(archive: tarfile.TarFile, directory: str):
+    """extracts only regular files and directories inside `directory`, so that an archive cannot write anywhere else"""
+    if hasattr(tarfile, 'data_filter'):
+        archive.extractall(directory, filter='data')
+        return
+    # pythons before 3.8.17 have no extraction filters
+    for member in archive.getmembers():
+        parts = member.name.replace('\\', '/').split('/')
+        if not (member.isfile() or member.isdir()) or os.path.isabs(member.name) or '..' in parts:
+            raise ValueError("Refusing to extract " + member.name + " from the mirror archive")
+    archive.extractall(directory)
+
+
+def check_mirror(mirror: str, external_files: List[str]):
+    """fails right away if anything but the sources is missing - these are checked once we know which are needed"""
+    missing = [mirror + sub for sub in (MIRROR_API, MIRROR_SOURCES) if not os.path.isdir(mirror + sub)]
+    missing += [mirror + MIRROR_EXTERNAL + f for f in external_files if not os.path.isfile(mirror + MIRROR_EXTERNAL + f)]
+    if len(missing) > 0:
+        raise OfflineError(missing)
+
+
+def pack_mirror(target: str, api_directory: str, source_directory: str, external_files: List[str]) -> str:
+    """collects everything needed for an offline build into a directory, or an archive depending on the name"""
+    missing = [path for path in [api_directory, source_directory, *external_files] if not os.path.exists(path)]
+    if len(missing) > 0:
+        raise OfflineError(missing)
+    suffix = archive_suffix(target)
+    directory = tempfile.mkdtemp(prefix='ui5_mirror_') if suffix is not None else target
+    try:
+        os.makedirs(directory, exist_ok=True)
+        shutil.copytree(api_directory, os.path.join(directory, MIRROR_API), dirs_exist_ok=True)
+        shutil.copytree(source_directory, os.path.join(directory, MIRROR_SOURCES), dirs_exist_ok=True)
+        os.makedirs(os.path.join(directory, MIRROR_EXTERNAL), exist_ok=True)
+        for path in external_files:
+            shutil.copy(path, os.path.join(directory, MIRROR_EXTERNAL))
+        if suffix is None:
+            return target
+        return shutil.make_archive(target[:-len(suffix)], ARCHIVE_FORMATS[suffix], directory)
+    finally:
+        if suffix is not None:
+            shutil.rmtree(directory, True)
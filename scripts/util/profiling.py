@@ -0,0 +1,89 @@
+import json
+import time
+from contextlib import contextmanager
+from typing import *
+
+
+class Profile:
+    """
+    how long the phases of a run took, how long each of their items took (e.g. loading one library),
+    and how much was done (counts), so that runs can be compared, e.g. those of a nightly build.
+    Phases that are entered more than once (e.g. loading during an incremental build) add up.
+    """
+    started: float
+    phases: Dict[str, float]  # phase -> seconds, in the order they were first entered
+    items: Dict[str, Dict[str, float]]  # phase -> item -> seconds
+    counts: Dict[str, int]
+    info: Dict[str, Any]  # about the run itself, e.g. its settings
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.items = {}
+        self.counts = {}
+        self.info = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def time_item(self, phase: str, item: str, seconds: float):
+        items = self.items.setdefault(phase, {})
+        items[item] = items.get(item, 0.0) + seconds
+
+    def count(self, name: str, amount: int = 1):
+        self.counts[name] = self.counts.get(name, 0) + amount
+
+    def report(self) -> dict:
+        return {
+            'info': self.info,
+            'total_seconds': time.perf_counter() - self.started,
+            'phases': self.phases,
+            'items': self.items,
+            'counts': self.counts,
+        }
+
+    def save(self, path: str):
+        with open(path, 'w', encoding='utf8') as f:
+            json.dump(self.report(), f, indent=1)
+
+    def summary(self) -> str:
+        return "Took %.1fs: " % (time.perf_counter() - self.started) + \
+               ", ".join("%s %.1fs" % (name, seconds) for name, seconds in self.phases.items())
+
+
+PROFILE = Profile()
+
+
+@contextmanager
+def profiler(path: Optional[str]):
+    """
+    profiles the code inside (of this process only, not its workers) and writes the result to `path`:
+    pyinstrument's html page for a .html file (needs `pip install pyinstrument`), otherwise cProfile stats
+    """
+    if path is None:
+        yield
+        return
+    if path.endswith('.html'):
+        from pyinstrument import Profiler
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            with open(path, 'w', encoding='utf8') as f:
+                f.write(profiler.output_html())
+    else:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(path)
@@ -0,0 +1,64 @@
+import gc
+import os
+import pickle
+from contextlib import contextmanager
+from typing import *
+
+from .build_state import generator_fingerprint
+from .profiling import PROFILE
+from .ts_structures import Declaration
+
+
+SNAPSHOT_FILE = "../.cache/declaration.snapshot"
+SNAPSHOT_VERSION = 2  # bump when the layout of the file changes
+
+
+def snapshot_header(inputs: Dict[str, str]) -> dict:
+    """
+    what a snapshot was made from: the model classes (the generator code, but not its output settings,
+    since those only matter for writing) and the api files (lib -> sha256, see `input_hashes`)
+    """
+    return {'version': SNAPSHOT_VERSION, 'code': generator_fingerprint({}), 'inputs': inputs}
+
+
+@contextmanager
+def without_gc():
+    """
+    the model consists of millions of small objects, and the garbage collector would scan them over and over again
+    while they are pickled or unpickled, even though none of them can be garbage yet
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def save_snapshot(decl: Declaration, path: str, inputs: Dict[str, str]):
+    """
+    stores the cleaned up declaration, after a small header that tells whether it is still up to date,
+    so that checking that does not need to read the whole model
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with PROFILE.phase('snapshot'), without_gc():
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(snapshot_header(inputs), f, pickle.HIGHEST_PROTOCOL)
+            pickle.dump(decl, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+
+
+def load_snapshot(path: str, inputs: Dict[str, str]) -> Optional[Declaration]:
+    """the declaration stored at `path`, or None if there is none or it was made from other code or inputs"""
+    try:
+        with PROFILE.phase('snapshot'), without_gc():
+            with open(path, 'rb') as f:
+                if pickle.load(f) != snapshot_header(inputs):
+                    return None
+                decl = pickle.load(f)
+    except (OSError, EOFError, ValueError, pickle.UnpicklingError, AttributeError, ImportError):
+        return None
+    for name, count in decl.counts().items():
+        PROFILE.count(name, count)
+    return decl
@@ -0,0 +1,162 @@
+import json
+import os
+import re
+from typing import *
+
+import requests
+
+from .fetching import DEFAULT_JOBS, DEFAULT_TIMEOUT, OfflineError, make_session, map_concurrently
+
+
+SOURCE_URL = "https://raw.githubusercontent.com/SAP/openui5/master/src/"
+CACHE_DIRECTORY = "../.cache/sources/"
+INDEX_FILE = "index.json"
+
+# we are searching for e.g. '.create = function', or 'constructor : function' for constructors
+METHOD_DEFINITION = re.compile(r"\.([\w$]+) = function")
+CONSTRUCTOR_DEFINITION = "constructor : function"
+CONSTRUCTOR = "constructor"
+
+
+def source_path(lib: str, uri: str) -> str:
+    return lib + "/src/" + uri.replace('.', '/') + ".js"
+
+
+def index_source(source: str) -> Dict[str, int]:
+    """method name -> number of the first line defining it, all in a single pass over the source"""
+    index = {}
+    for number, line in enumerate(source.split('\n'), 1):
+        if ' = function' in line:
+            for name in METHOD_DEFINITION.findall(line):
+                if name != CONSTRUCTOR:
+                    index.setdefault(name, number)
+        if CONSTRUCTOR_DEFINITION in line:
+            index.setdefault(CONSTRUCTOR, number)
+    return index
+
+
+class SourceCache:
+    """
+    The OpenUI5 source files of all classes, to link methods to the line they are defined in.
+    Every source is downloaded once, stored on disk, and indexed right away,
+    so that looking up a method is a dict access, and later runs need neither the network nor the sources.
+    """
+    directory: str
+    offline: bool  # only use what is already in the directory, e.g. an offline mirror
+    indexes: Optional[Dict[str, Optional[Dict[str, int]]]]  # lib//uri -> method index, None if there is no source
+    failed: Set[str]  # lib//uri that could not be downloaded during this run, we do not try again until the next one
+    dirty: bool
+    session: Optional[requests.Session]
+
+    def __init__(self, directory: str = CACHE_DIRECTORY, offline: bool = False):
+        self.directory = directory
+        self.offline = offline
+        self.indexes = None
+        self.failed = set()
+        self.dirty = False
+        self.session = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['session'] = None
+        return state
+
+    def part(self, sources: Iterable[Tuple[str, str]]) -> 'SourceCache':
+        """a cache with only what is known of the given (lib, uri) sources, e.g. to hand to a writer process"""
+        part = SourceCache(self.directory, self.offline)
+        indexes = self.load_indexes()
+        part.indexes = {}
+        for lib, uri in sources:
+            key = lib + "//" + uri
+            if key in indexes:
+                part.indexes[key] = indexes[key]
+            elif key in self.failed:
+                part.failed.add(key)
+        return part
+
+    def line_of(self, lib: str, uri: str, method_name: str) -> Optional[int]:
+        index = self.index(lib, uri)
+        if index is None:
+            return None
+        return index.get(method_name)
+
+    def index(self, lib: str, uri: str) -> Optional[Dict[str, int]]:
+        indexes = self.load_indexes()
+        key = lib + "//" + uri
+        if key not in indexes:
+            if key in self.failed:
+                return None
+            found, source = self.fetch(lib, uri)
+            if not found:
+                self.failed.add(key)
+                return None
+            indexes[key] = None if source is None else index_source(source)
+            self.dirty = True
+        return indexes[key]
+
+    def prefetch(self, sources: Iterable[Tuple[str, str]], jobs: int = DEFAULT_JOBS) -> Dict[str, int]:
+        """
+        makes sure all given (lib, uri) sources are indexed, downloading up to `jobs` missing ones at the same time.
+        Returns how many sources were already cached ('hit'), downloaded ('miss'), do not exist ('404')
+        or could not be downloaded ('failed').
+        """
+        indexes = self.load_indexes()
+        sources = sorted(set(sources))
+        missing = [source for source in sources
+                   if source[0] + "//" + source[1] not in indexes and source[0] + "//" + source[1] not in self.failed]
+        if self.offline and len(missing) > 0:
+            raise OfflineError([self.directory + source_path(lib, uri) for lib, uri in missing])
+        counts = {'hit': len(sources) - len(missing), 'miss': 0, '404': 0, 'failed': 0}
+        if len(missing) > 0 and self.session is None:
+            self.session = make_session(jobs)
+        for (lib, uri), (found, source) in zip(missing, map_concurrently(lambda s: self.fetch(*s), missing, jobs)):
+            if not found:
+                self.failed.add(lib + "//" + uri)
+                counts['failed'] += 1
+                continue
+            counts['miss' if source is not None else '404'] += 1
+            indexes[lib + "//" + uri] = None if source is None else index_source(source)
+            self.dirty = True
+        return counts
+
+    def fetch(self, lib: str, uri: str) -> Tuple[bool, Optional[str]]:
+        """(whether we know the answer, the source if there is one) - network failures are retried next run"""
+        if self.offline:
+            return False, None
+        if self.session is None:
+            self.session = make_session()
+        try:
+            req = self.session.get(SOURCE_URL + source_path(lib, uri), timeout=DEFAULT_TIMEOUT)
+        except requests.RequestException:
+            print("Cannot access source code for " + lib + "//" + uri)
+            return False, None
+        if req.status_code == 404:
+            return True, None
+        if req.status_code != 200:
+            print("Cannot access source code for " + lib + "//" + uri)
+            return False, None
+        self.store_source(lib, uri, req.text)
+        return True, req.text
+
+    def store_source(self, lib: str, uri: str, source: str):
+        path = self.directory + source_path(lib, uri)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf8', newline='') as f:
+            f.write(source)
+
+    def load_indexes(self) -> Dict[str, Optional[Dict[str, int]]]:
+        if self.indexes is None:
+            try:
+                with open(self.directory + INDEX_FILE, encoding='utf8') as f:
+                    self.indexes = json.load(f)
+            except (OSError, ValueError):
+                self.indexes = {}
+        return self.indexes
+
+    def save(self):
+        if not self.dirty:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.directory + INDEX_FILE, 'w', encoding='utf8') as f:
+            json.dump(self.indexes, f, sort_keys=True)
+        self.dirty = False
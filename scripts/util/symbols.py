@@ -0,0 +1,128 @@
+import hashlib
+from typing import *
+
+from .comment import ANY_CROSS_LINK
+from .util_functions import *
+
+
+# kinds that open a scope in typescript, so that they can hide a global name of the same name
+SCOPE_KINDS = ('namespace', 'class', 'interface', 'enum', 'typedef')
+MAX_REPORTED = 10
+
+
+class Symbol:
+    __slots__ = ('kind', 'lib', 'file')
+    kind: str  # namespace, class, interface, enum, typedef or function
+    lib: Optional[str]  # None for namespaces that are only implied by the symbols in them
+    file: Optional[str]  # the .d.ts file the symbol is written to
+
+    def __init__(self, kind: str, lib: Optional[str], file: Optional[str]):
+        self.kind = kind
+        self.lib = lib
+        self.file = file
+
+
+def file_of(namespace_path: str) -> Optional[str]:
+    if len(namespace_path) == 0:
+        return None
+    return '.'.join([pp_name(name) for name in namespace_path.split('.')]) + '.d.ts'
+
+
+class SymbolTable:
+    """
+    every symbol declared by the loaded libraries by its full name, built once after loading.
+    It answers whether a name exists and whether it needs to be qualified, and records who refers to what.
+    """
+    symbols: Dict[str, Symbol]
+    roots: Set[str]  # the first segments of all symbols, e.g. 'sap'
+    referrers: Dict[str, Set[str]]  # full name -> uris of the symbols whose types or docs refer to it
+    unresolved: Dict[str, Set[str]]  # unknown full name -> uris of the symbols that refer to it
+    shadowed: Dict[Tuple[str, str], bool]  # (scope, first part of a name) -> whether it needs globalThis.
+
+    def __init__(self, declared: Dict[str, List[Tuple[str, str]]] = None):
+        """`declared` maps each library to the (full name, kind) of the symbols it declares, see `Declaration`"""
+        self.symbols = {}
+        self.referrers = {}
+        self.unresolved = {}
+        self.shadowed = {}
+        for lib in sorted(declared or {}):
+            for name, kind in declared[lib]:
+                # a later library re-declaring a symbol wins, like in the model
+                self.symbols[name] = Symbol(kind, lib, file_of(name if kind == 'namespace' else parent_path(name)))
+        for name in list(self.symbols):
+            path = parent_path(name)
+            while len(path) > 0 and path not in self.symbols:
+                self.symbols[path] = Symbol('namespace', None, file_of(path))
+                path = parent_path(path)
+        self.roots = {name.split('.', 1)[0] for name in self.symbols}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.symbols
+
+    def names(self) -> FrozenSet[str]:
+        """the full names of all symbols, which is all that rendering needs to know (see `Comment.is_symbol`)"""
+        return frozenset(self.symbols)
+
+    def digest(self) -> str:
+        """changes whenever a symbol is added or removed, or changes its kind"""
+        h = hashlib.sha256()
+        for name in sorted(self.symbols):
+            h.update((name + ' ' + self.symbols[name].kind + '\n').encode('utf8'))
+        return h.hexdigest()
+
+    def scope_of(self, uri: str) -> str:
+        """the namespace that the declaration `uri` is written in"""
+        symbol = self.symbols.get(uri)
+        if symbol is not None and symbol.kind != 'namespace':
+            return parent_path(uri)
+        return uri
+
+    def refer(self, name: str, referrer: str):
+        """records a reference to the full name `name`, if that is a name from the loaded libraries"""
+        if name in self.symbols:
+            self.referrers.setdefault(name, set()).add(referrer)
+        elif name.split('.', 1)[0] in self.roots:
+            self.unresolved.setdefault(name, set()).add(referrer)
+
+    def qualify(self, name: str, referrer: str) -> str:
+        """
+        how to write the full name `name` in the declaration of `referrer`:
+        typescript looks up the first part of a name in all enclosing namespaces before the global ones,
+        so if one of them declares something of the same name, the name has to start with globalThis.
+        """
+        self.refer(name, referrer)
+        key = (self.scope_of(referrer), name.split('.', 1)[0])
+        shadowed = self.shadowed.get(key)
+        if shadowed is None:
+            shadowed = self.shadowed[key] = self.is_shadowed(*key)
+        return 'globalThis.' + name if shadowed else name
+
+    def is_shadowed(self, scope: str, first: str) -> bool:
+        while len(scope) > 0:
+            symbol = self.symbols.get(scope + '.' + first)
+            if symbol is not None and symbol.kind in SCOPE_KINDS:
+                return True
+            scope = parent_path(scope)
+        return False
+
+    def check_links(self, text: Optional[str], referrer: str):
+        """records the targets of the doc links in `text`, see `Comment.markup`"""
+        if text is None:
+            return
+        for match in ANY_CROSS_LINK.finditer(text):
+            self.refer(match.group(1), referrer)
+
+    def report(self) -> Optional[str]:
+        """a summary of all references to unknown symbols, or None if everything resolved"""
+        if len(self.unresolved) == 0:
+            return None
+        count = sum(len(referrers) for referrers in self.unresolved.values())
+        worst = sorted(self.unresolved, key=lambda name: (-len(self.unresolved[name]), name))
+        lines = ["%d unknown symbols are referred to from %d places, most often:" % (len(self.unresolved), count)]
+        for name in worst[:MAX_REPORTED]:
+            lines.append("  %s (from %d places, e.g. %s)" % (name, len(self.unresolved[name]), min(self.unresolved[name])))
+        return '\n'.join(lines)
+
+
+def parent_path(name: str) -> str:
+    return name.rsplit('.', 1)[0] if '.' in name else ''
@@ -1,16 +1,21 @@
+import io
 import json
+import time
+from concurrent.futures import ProcessPoolExecutor
 from typing import *
 
 from .ts_typing import *
 from .comment import *
+from .profiling import PROFILE
+from .source_cache import SourceCache
+from .symbols import SymbolTable
 from .util_functions import *
 
-import requests
-import requests_cache
-requests_cache.install_cache(allowable_codes=(200, 404))
-
 
 ENABLE_SOURCE_LINKS_WITH_LINE_NUMBERS = True
+ENABLE_SHARED_OBJECT_TYPES = True  # object literal types that repeat within a file get a type alias, see `Namespace`
+MIN_SHARED_FIELDS = 4  # smaller object literal types are easier to read inline, and sharing them saves next to nothing
+SHARED_TYPE_NAME = 'Shared'  # what a shared type is named after if its first parameter has no name
 INDENT = '    '
 FILE_HEADER = "/**\n" \
               " * Auto generated UI5 declarations by Erik Brendel - do not modify\n" \
@@ -18,19 +23,12 @@ FILE_HEADER = "/**\n" \
               " */\n\n\n" \
               "declare "
 
-SOURCE_CACHE = {}
-
-
-def get_source(lib: str, uri: str) -> str:
-    req = requests.get("https://raw.githubusercontent.com/SAP/openui5/master/src/" + lib + "/src/" + uri.replace('.', '/') + ".js")
-    try:
-        return req.text
-    except ValueError:
-        print("Cannot access source code for " + lib + "//" + uri)
-        return ''
+SOURCE_CACHE = SourceCache()
+SYMBOLS: Optional[Container[str]] = None  # the symbol names of the declaration being written, for resolving doc links
 
 
 class Parameter:
+    __slots__ = ('name', 'description', 'types', 'optional', 'depth', 'type', 'sub_parameters')
     name: str
     description: str
     types: any
@@ -40,7 +38,7 @@ class Parameter:
     sub_parameters: List['Parameter']
 
     def __init__(self, json_parameter: json):
-        self.name = json_parameter['name']
+        self.name = intern(json_parameter['name'])
         self.description = json_parameter.get('description')
         self.types = json_parameter.get('types')
         self.optional = json_parameter.get('optional', False)
@@ -58,24 +56,32 @@ class Parameter:
             name += ": " + self.type.written()
         return name
 
-    def merge(self, other: 'Parameter'):
-        self.name = self.name + 'Or' + capitalize_first(other.name)
-        self.type = self.type.combine_with(other.type)
+    def merge_all(self, others: List['Parameter']):
+        """
+        this parameter could also be any of the `others`: their names are appended, and their types combined.
+        The union keeps repeated options, since rendering writes each distinct option once anyway (and hashing every
+        option to drop them costs more than merging). That also keeps every plain object: `clean_up` only puts this
+        parameter's own object type in place of the first one, the others stand for the objects of the merged ones.
+        """
+        self.name = self.name + ''.join(['Or' + capitalize_first(other.name) for other in others])
+        options = [option for p in [self, *others] if p.type is not None for option in p.type.union_options()]
+        self.type = CombinedType(options) if len(options) > 0 else None
 
     def clean_up(self):
         if self.type is not None and self.type.contains_plain_object() and len(self.sub_parameters) > 0:
-            fancy_object = TsType.parse_single('{' + ', '.join([s.written() for s in self.sub_parameters]) + '}')
+            fancy_object = ObjectType([(pp_name(s.name), s.optional, s.type) for s in self.sub_parameters])
             self.type = self.type.replace_plain_object_with(fancy_object)
 
-    def trim_by(self, parent_uri: str):
+    def trim_by(self, parent_uri: str, symbols: SymbolTable):
         if self.type is not None:
-            self.type.trim_by(parent_uri)
+            self.type = self.type.trim_by(parent_uri, symbols)
 
     def add_sub_parameter(self, p: 'Parameter'):
         self.sub_parameters.append(p)
 
 
 class Method:
+    __slots__ = ('lib', 'parent_uri', 'name', 'static', 'visibility', 'description', 'parameters', 'return_type', 'needs_function_word')
     lib: Optional[str]
     parent_uri: str
     name: str
@@ -87,11 +93,12 @@ class Method:
     needs_function_word: bool
 
     def __init__(self, parent_uri: str, lib: Optional[str], json_method: json):
-        self.lib = lib
-        self.parent_uri = parent_uri
+        self.lib = intern(lib)
+        self.parent_uri = intern(parent_uri)
         self.name = json_method.get('name', '').split('/')[-1]
         self.static = self.should_be_static()
-        self.visibility = json_method.get('visibility')
+        self.name = intern(self.name)
+        self.visibility = intern(json_method.get('visibility'))
         self.description = json_method.get('description')
         self.parameters = []
         self.return_type = None
@@ -122,17 +129,24 @@ class Method:
         else:
             return self.name
 
+    def comment(self) -> Optional[Comment]:
+        if self.description is None:
+            return None
+        comment = Comment(self.description, self.parent_uri, "/methods/" + self.maybe_static_name())
+        for param in self.parameters:
+            comment.add_parameter(param.name, param.description)
+            for sub in param.sub_parameters:
+                comment.add_parameter(param.name + '.' + sub.name, sub.description)
+        comment.lib = self.lib
+        comment.source_code_line = self.get_source_line()
+        comment.symbols = SYMBOLS
+        return comment
+
     def write(self, f: 'TextIO', indent: str):
         if len(self.name) == 0:
             return
-        if self.description is not None:
-            comment = Comment(self.description, self.parent_uri, "/methods/" + self.maybe_static_name())
-            for param in self.parameters:
-                comment.add_parameter(param.name, param.description)
-                for sub in param.sub_parameters:
-                    comment.add_parameter(param.name + '.' + sub.name, sub.description)
-            comment.lib = self.lib
-            comment.source_code_line = self.get_source_line()
+        comment = self.comment()
+        if comment is not None:
             comment.write(f, indent)
         f.write(indent)
         if self.visibility is not None:
@@ -153,33 +167,16 @@ class Method:
             return None
         if self.lib is None:
             return None
-        soure_cache_key = self.lib + "//" + self.parent_uri
-        lines = None
-        if soure_cache_key in SOURCE_CACHE:
-            lines = SOURCE_CACHE[soure_cache_key]
-        else:
-            source = get_source(self.lib, self.parent_uri)
-            if len(source) >= 0 and '404' not in source:
-                lines = [l.strip() for l in source.split('\n')]
-            SOURCE_CACHE[soure_cache_key] = lines
-        if lines is None:
-            return None
-        # we are searching for e.g. '.create = function'
-        target_search = '.' + self.name + ' = function'
-        if self.name == 'constructor':
-            target_search = 'constructor : function'
-        for i, line in zip(range(len(lines)), lines):
-            if target_search in line:
-                return i + 1
-        return None
+        return SOURCE_CACHE.line_of(self.lib, self.parent_uri, self.name)
 
-    def clean_up(self):
+    def clean_up(self, symbols: SymbolTable):
         self.shift_optional_parameters()
+        symbols.check_links(self.description, self.parent_uri)
         for param in self.parameters:
             param.clean_up()
-            param.trim_by(self.parent_uri)
+            param.trim_by(self.parent_uri, symbols)
         if self.return_type is not None:
-            self.return_type.trim_by(self.parent_uri)
+            self.return_type = self.return_type.trim_by(self.parent_uri, symbols)
 
     def shift_optional_parameters(self):
         """
@@ -187,74 +184,89 @@ class Method:
         Core.js::attachValidationSuccess(oData?, fnFunction, oListener?);
         So instead, we are shifting the optionality backwards, renaming the parameters to show the ambiguity:
         Core.js::attachValidationSuccess(oDataOrFnFunction, fnFunctionOrOListener?, oListener?);
+        Each parameter is merged with all the later ones it could stand for at once (see `merged_parameter_ends`).
         """
-        if self.num_params() <= 1:
-            return
-        for i in range(1, self.num_params()):
-            if self.parameters[i - 1].optional and not self.parameters[i].optional:
-                self.shift_optional_parameter(i)
-
-    def shift_optional_parameter(self, index):
-        first_optional_index = self.first_optional_index()
-        shift_distance = index - first_optional_index
-        assert shift_distance >= 1
-        self.parameters[first_optional_index].optional = False
-        self.parameters[index].optional = True
-        for i in range(first_optional_index, self.num_params()):
-            for o in range(1, shift_distance + 1):
-                self.merge_parameters(i, i + o)
-
-    def merge_parameters(self, target_index: int, extra_content_index: int):
-        if extra_content_index >= self.num_params():
+        ends = self.merged_parameter_ends()
+        if ends is None:
             return
-        self.parameters[target_index].merge(self.parameters[extra_content_index])
-
-    def first_optional_index(self) -> int:
-        i = 0
-        for p in self.parameters:
+        # in order, so that every parameter is merged with the later ones before they are changed themselves
+        for i, end in enumerate(ends):
+            if end > i:
+                self.parameters[i].merge_all(self.parameters[i + 1:end + 1])
+        required = sum(1 for p in self.parameters if not p.optional)
+        for i, p in enumerate(self.parameters):
+            p.optional = i >= required
+
+    def merged_parameter_ends(self) -> Optional[List[int]]:
+        """
+        for each parameter, the index of the last parameter it gets merged with,
+        or None if there is no required parameter after an optional one.
+        Every such required parameter takes the optionality from the first optional parameter before it,
+        so every parameter from that one on could also be one of the next (number of optional parameters before it)
+        parameters. These distances add up, e.g. (a?, b?, c, d?, e) gives (aOrBOrC, bOrCOrDOrE, cOrDOrE?, dOrE?, e?)
+        """
+        shifts = []  # (index of the first parameter that shifts, distance) for each required parameter
+        optional = 0
+        for i, p in enumerate(self.parameters):
             if p.optional:
-                return i
-            i += 1
-        return -42
-
-    def num_params(self) -> int:
-        return len(self.parameters)
+                optional += 1
+            elif optional > 0:
+                shifts.append((i - optional, optional))
+        if len(shifts) == 0:
+            return None
+        last = len(self.parameters) - 1
+        ends = []
+        applied = distance = 0
+        for i in range(len(self.parameters)):
+            while applied < len(shifts) and shifts[applied][0] <= i:
+                distance += shifts[applied][1]
+                applied += 1
+            ends.append(min(i + distance, last))
+        return ends
 
 
 class CodeBlock:
-    parent: 'Namespace'
+    __slots__ = ('name', 'uri', 'description', 'has_sample', 'ux_guide', 'lib')
     name: str
+    uri: str
     description: Optional[str]
     has_sample: bool
     ux_guide: Optional[Tuple[str, str]]  # (url, displayString)
     lib: Optional[str]
 
     def __init__(self, name: str, parent: 'Namespace'):
-        self.parent = parent
         self.name = name
+        self.uri = intern(parent.full_uri() + "." + name)
         self.description = None
         self.has_sample = False
         self.ux_guide = None
         self.lib = None
 
-    def full_uri(self):
-        return self.parent.full_uri() + "." + self.name
+    def full_uri(self) -> str:
+        return self.uri
 
-    def write_comment(self, f: 'TextIO', indent: str):
+    def comment(self) -> Optional[Comment]:
         if self.description is None:
-            return
+            return None
         comment = Comment(self.description, self.full_uri())
         comment.has_sample = self.has_sample
         comment.ux_guide = self.ux_guide
         comment.lib = self.lib
-        comment.write(f, indent)
+        comment.symbols = SYMBOLS
+        return comment
+
+    def write_comment(self, f: 'TextIO', indent: str):
+        comment = self.comment()
+        if comment is not None:
+            comment.write(f, indent)
 
     def set_lib(self, lib: str) -> 'CodeBlock':
-        self.lib = lib
+        self.lib = intern(lib)
         return self
 
 
 class Class(CodeBlock):
+    __slots__ = ('base_class', 'interfaces', 'methods', 'constructor', 'is_interface')
     name: str
     base_class: Optional[TsType]
     interfaces: []
@@ -315,18 +327,20 @@ class Class(CodeBlock):
         else:
             return "class"
 
-    def clean_up(self):
+    def clean_up(self, symbols: SymbolTable):
+        symbols.check_links(self.description, self.uri)
         if self.base_class is not None:
-            self.base_class.trim_by(self.full_uri())
+            self.base_class = self.base_class.trim_by(self.full_uri(), symbols)
         if self.constructor is not None:
-            self.constructor.clean_up()
+            self.constructor.clean_up(symbols)
         for name, method in self.methods.items():
-            method.clean_up()
+            method.clean_up(symbols)
             if self.is_interface:
                 method.visibility = None
 
 
 class Enum(CodeBlock):
+    __slots__ = ('options',)
     options: List[Tuple[str, str]]  # (name, comment)
 
     def __init__(self, name, parent: 'Namespace'):
@@ -342,20 +356,33 @@ class Enum(CodeBlock):
         long_name_length = len(json_enum['name']) + 1
         self.options = [(o['name'][long_name_length:], o.get('description')) for o in options]
 
-    def clean_up(self):
-        pass
+    def clean_up(self, symbols: SymbolTable):
+        symbols.check_links(self.description, self.uri)
+        for name, description in self.options:
+            symbols.check_links(description, self.uri)
+
+    def option_comments(self) -> List[Optional[Comment]]:
+        comments = []
+        for name, description in self.options:
+            comment = None
+            if description is not None:
+                comment = Comment(description)
+                comment.symbols = SYMBOLS
+            comments.append(comment)
+        return comments
 
     def write(self, f: 'TextIO', indent: str):
         self.write_comment(f, indent)
         f.write(indent + 'enum ' + pp_name(self.name) + ' {\n')
-        for (name, description) in self.options:
-            if description is not None:
-                Comment(description).write(f, indent + INDENT)
+        for comment, (name, description) in zip(self.option_comments(), self.options):
+            if comment is not None:
+                comment.write(f, indent + INDENT)
             f.write(indent + INDENT + name + ",\n")
         f.write(indent + '}\n')
 
 
 class Typedef(CodeBlock):
+    __slots__ = ('type',)
     type: TsType
 
     def __init__(self, name: str, parent: 'Namespace'):
@@ -374,78 +401,123 @@ class Typedef(CodeBlock):
             self.description = 'Needs to follow this regex: ' + meta['pattern']
 
 
+class SymbolIndex:
+    """every namespace, class, enum and typedef of a declaration by its path from the root namespace"""
+    __slots__ = ('namespaces', 'classes', 'enums', 'typedefs')
+    namespaces: Dict[str, 'Namespace']
+    classes: Dict[str, Class]
+    enums: Dict[str, Enum]
+    typedefs: Dict[str, Typedef]
+
+    def __init__(self):
+        self.namespaces = {}
+        self.classes = {}
+        self.enums = {}
+        self.typedefs = {}
+
+    def remove(self, ns: 'Namespace'):
+        """forgets a namespace and everything below it"""
+        for removed in ns.walk():
+            self.namespaces.pop(removed.uri, None)
+            for kind in ('classes', 'enums', 'typedefs'):
+                index = getattr(self, kind)
+                for name in getattr(removed, kind):
+                    index.pop(removed.path_of(name), None)
+
+
 class Namespace:
+    __slots__ = ('parent', 'name', 'uri', 'index', 'namespaces', 'classes', 'enums', 'typedefs', 'methods', 'libs',
+                 'shared_types')
     parent: Optional['Namespace']
     name: str
+    uri: str
+    index: SymbolIndex  # shared by the whole tree
     namespaces: Dict[str, 'Namespace']
     classes: Dict[str, Class]
     enums: Dict[str, Enum]
     typedefs: Dict[str, Typedef]
     methods: Dict[str, Method]
+    libs: Set[str]  # the libraries that contributed to this namespace's own file
+    shared_types: Dict[str, TsType]  # alias name -> object literal type that several parameters in this file have
 
     def __init__(self, name: str, parent: 'Namespace' = None):
         self.parent = parent
         self.name = name
+        if parent is None or parent.full_uri() == 'root':
+            self.uri = intern(name)
+        else:
+            self.uri = intern(parent.full_uri() + "." + name)
+        self.index = SymbolIndex() if parent is None else parent.index
         self.namespaces = {}
         self.classes = {}
         self.enums = {}
         self.typedefs = {}
         self.methods = {}
+        self.libs = set()
+        self.shared_types = {}
 
-    def resolve_namespace(self, uri: str) -> 'Namespace':
+    def path_of(self, uri: str) -> str:
+        """the path from the root namespace, which is what the symbol index uses as keys"""
+        return uri if self.parent is None else self.uri + "." + uri
+
+    def split_uri(self, uri: str) -> Tuple['Namespace', str]:
+        """the namespace that contains the symbol `uri`, and the symbol's own name"""
         if '.' in uri:
-            [name, rest] = uri.split('.', 1)
-            return self.resolve_single_namespace(name).resolve_namespace(rest)
-        else:
-            return self.resolve_single_namespace(uri)
+            [path, name] = uri.rsplit('.', 1)
+            return self.resolve_namespace(path), name
+        return self, uri
+
+    def resolve_namespace(self, uri: str) -> 'Namespace':
+        ns = self.index.namespaces.get(self.path_of(uri))
+        if ns is not None:
+            return ns
+        parent, name = self.split_uri(uri)
+        return parent.resolve_single_namespace(name)
 
     def resolve_single_namespace(self, name) -> 'Namespace':
         if name not in self.namespaces:
-            self.namespaces[name] = Namespace(name, self)
+            self.namespaces[name] = self.index.namespaces[self.path_of(name)] = Namespace(name, self)
         return self.namespaces[name]
 
     def resolve_class(self, uri) -> Class:
-        if '.' in uri:
-            [name, rest] = uri.split('.', 1)
-            return self.resolve_single_namespace(name).resolve_class(rest)
-        else:
-            return self.resolve_single_class(uri)
+        clazz = self.index.classes.get(self.path_of(uri))
+        if clazz is not None:
+            return clazz
+        parent, name = self.split_uri(uri)
+        return parent.resolve_single_class(name)
 
     def resolve_single_class(self, name) -> Class:
         if name not in self.classes:
-            self.classes[name] = Class(name, self)
+            self.classes[name] = self.index.classes[self.path_of(name)] = Class(name, self)
         return self.classes[name]
 
     def resolve_enum(self, uri) -> Enum:
-        if '.' in uri:
-            [name, rest] = uri.split('.', 1)
-            return self.resolve_single_namespace(name).resolve_enum(rest)
-        else:
-            return self.resolve_single_enum(uri)
+        enum = self.index.enums.get(self.path_of(uri))
+        if enum is not None:
+            return enum
+        parent, name = self.split_uri(uri)
+        return parent.resolve_single_enum(name)
 
     def resolve_single_enum(self, name) -> Enum:
         if name not in self.enums:
-            self.enums[name] = Enum(name, self)
+            self.enums[name] = self.index.enums[self.path_of(name)] = Enum(name, self)
         return self.enums[name]
 
     def resolve_typedef(self, uri) -> Typedef:
-        if '.' in uri:
-            [name, rest] = uri.split('.', 1)
-            return self.resolve_single_namespace(name).resolve_typedef(rest)
-        else:
-            return self.resolve_single_typedef(uri)
+        typedef = self.index.typedefs.get(self.path_of(uri))
+        if typedef is not None:
+            return typedef
+        parent, name = self.split_uri(uri)
+        return parent.resolve_single_typedef(name)
 
     def resolve_single_typedef(self, name) -> Typedef:
         if name not in self.typedefs:
-            self.typedefs[name] = Typedef(name, self)
+            self.typedefs[name] = self.index.typedefs[self.path_of(name)] = Typedef(name, self)
         return self.typedefs[name]
 
     def resolve_method(self, uri, json_method) -> Method:
-        if '.' in uri:
-            [name, rest] = uri.split('.', 1)
-            return self.resolve_single_namespace(name).resolve_method(rest, json_method)
-        else:
-            return self.resolve_single_method(json_method)
+        parent, name = self.split_uri(uri)
+        return parent.resolve_single_method(json_method)
 
     def resolve_single_method(self, json_method) -> Method:
         m = Method(self.full_uri(), None, json_method)
@@ -455,60 +527,291 @@ class Namespace:
             self.methods[name] = m
         return self.methods[name]
 
-    def write(self, indent: str, name: str, directory: str):
+    def files(self, name: str) -> Iterator[Tuple[str, 'Namespace']]:
+        """(written name, namespace) of every namespace in this subtree that gets its own file, in writing order"""
         if len(self.name) == 0:
             return
         my_name = (name + "." if len(name) > 0 else '') + pp_name(self.name)
         for key in sorted(self.namespaces):
-            self.namespaces[key].write(indent, my_name, directory)
+            yield from self.namespaces[key].files(my_name)
 
         if len(self.typedefs) + len(self.enums) + len(self.classes) + len(self.methods) > 0:
-            with open(directory + my_name + '.d.ts', 'w', encoding="utf8") as f:
-                f.write(FILE_HEADER)
-                f.write(indent + "namespace " + my_name + " {\n")
-                for name, typedef in self.typedefs.items():
-                    typedef.write(f, indent + INDENT)
-                for key in sorted(self.enums):
-                    self.enums[key].write(f, indent + INDENT)
-                for key in sorted(self.methods):
-                    self.methods[key].write(f, indent + INDENT)
-                for key in sorted(self.classes):
-                    self.classes[key].write(f, indent + INDENT)
-                f.write(indent + "}\n")
+            yield my_name, self
 
-    def clean_up(self):
+    def file_part(self) -> 'Namespace':
+        """
+        a namespace with only what this namespace's own file is rendered from, without the tree around it,
+        so that handing it to a writer process does not hand over the whole declaration
+        """
+        part = Namespace(self.name)
+        part.uri = self.uri
+        part.classes = self.classes
+        part.enums = self.enums
+        part.typedefs = self.typedefs
+        part.methods = self.methods
+        part.libs = self.libs
+        part.shared_types = self.shared_types
+        return part
+
+    def descriptions(self) -> Iterator[str]:
+        """the descriptions that rendering this namespace's file marks up, see `DescriptionStore`"""
+        for block in [*self.typedefs.values(), *self.enums.values(), *self.classes.values()]:
+            if block.description is not None:
+                yield block.description
+        for enum in self.enums.values():
+            for name, description in enum.options:
+                if description is not None:
+                    yield description
+        for method in self.file_methods():
+            if method.description is not None:
+                yield method.description
+
+    def source_files(self) -> Iterator[Tuple[str, str]]:
+        """(lib, uri) of every source file that `Method.get_source_line` looks into while writing this file"""
+        for clazz in self.classes.values():
+            methods = list(clazz.methods.values())
+            if clazz.constructor is not None:
+                methods.append(clazz.constructor)
+            for method in methods:
+                if method.lib is not None and method.description is not None and len(method.name) > 0:
+                    yield method.lib, method.parent_uri
+
+    def size(self) -> int:
+        """a rough estimate of how much work rendering this namespace's file is"""
+        return len(self.typedefs) + len(self.enums) + len(self.methods) + \
+            sum(len(c.methods) + 1 for c in self.classes.values())
+
+    def render(self, indent: str, my_name: str) -> str:
+        f = io.StringIO()
+        f.write(FILE_HEADER)
+        f.write(indent + "namespace " + my_name + " {\n")
+        for name, typedef in self.typedefs.items():
+            typedef.write(f, indent + INDENT)
+        for name, shared_type in self.shared_types.items():
+            f.write(indent + INDENT + 'type ' + name + ' = ' + shared_type.written() + '\n')
+        for key in sorted(self.enums):
+            self.enums[key].write(f, indent + INDENT)
+        for key in sorted(self.methods):
+            self.methods[key].write(f, indent + INDENT)
+        for key in sorted(self.classes):
+            self.classes[key].write(f, indent + INDENT)
+        f.write(indent + "}\n")
+        return f.getvalue()
+
+    def walk(self) -> Iterator['Namespace']:
+        """this namespace and all namespaces below it"""
+        yield self
+        for ns in self.namespaces.values():
+            yield from ns.walk()
+
+    def clean_up(self, symbols: SymbolTable):
         for name in list(self.namespaces.keys()):
             if ' ' in name:
-                self.namespaces.pop(name)
+                self.index.remove(self.namespaces.pop(name))
         for name, ns in self.namespaces.items():
-            ns.clean_up()
+            ns.clean_up(symbols)
         for name, enum in self.enums.items():
-            enum.clean_up()
+            enum.clean_up(symbols)
         for name, method in self.methods.items():
-            method.clean_up()
+            method.clean_up(symbols)
         for name, clazz in self.classes.items():
-            clazz.clean_up()
+            clazz.clean_up(symbols)
+        if ENABLE_SHARED_OBJECT_TYPES:
+            self.share_object_types(symbols)
 
-    def full_uri(self):
-        if self.parent is None or self.parent.full_uri() == 'root':
-            return self.name
-        return self.parent.full_uri() + "." + self.name
+    def file_methods(self) -> Iterator[Method]:
+        """the functions and the methods of the classes in this namespace's file, in writing order"""
+        for key in sorted(self.methods):
+            yield self.methods[key]
+        for key in sorted(self.classes):
+            clazz = self.classes[key]
+            if clazz.constructor is not None:
+                yield clazz.constructor
+            for name in sorted(clazz.methods):
+                yield clazz.methods[name]
+
+    def share_object_types(self, symbols: SymbolTable):
+        """
+        the same object literal types (e.g. of mSettings parameters) would otherwise be written out again and again,
+        so those that occur more than once in this file (and have a few fields) are declared once,
+        named after the first parameter using them (see `SHARED_TYPE_NAME`).
+        Types are already trimmed, and all parameters in this file are trimmed for this namespace as their scope.
+        """
+        parameters = [p for m in self.file_methods() for p in m.parameters if p.type is not None]
+        uses = {}  # object type -> (number of uses, name of its first parameter)
+        for p in parameters:
+            for option in dict.fromkeys(p.type.union_options()):  # merged parameters can repeat options
+                if isinstance(option, ObjectType) and len(option.fields) >= MIN_SHARED_FIELDS:
+                    count, name = uses.get(option, (0, p.name))
+                    uses[option] = (count + 1, name)
+        aliases = {}
+        for object_type, (count, name) in uses.items():
+            if count > 1:
+                base = pp_name(name)
+                alias = self.free_type_name(capitalize_first(base or SHARED_TYPE_NAME) + 'Object', symbols)
+                self.shared_types[alias] = object_type
+                aliases[object_type] = TypeLiteral.of(alias)
+        if len(aliases) == 0:
+            return
+        for p in parameters:
+            if p.type in aliases:
+                p.type = aliases[p.type]
+            elif isinstance(p.type, CombinedType) and any(option in aliases for option in p.type.options):
+                p.type = CombinedType([aliases.get(option, option) for option in p.type.options])
+
+    def free_type_name(self, name: str, symbols: SymbolTable) -> str:
+        """`name`, or with a number after it, so that it neither hides a symbol nor another alias"""
+        candidate = name
+        number = 1
+        while candidate in self.shared_types or self.path_of(candidate) in symbols or candidate in symbols.roots:
+            number += 1
+            candidate = name + str(number)
+        return candidate
+
+    def full_uri(self) -> str:
+        return self.uri
 
     def load(self, json_namespace):
         for json_method in json_namespace.get('methods', {}):
             self.resolve_single_method(json_method).visibility = None
 
 
+SYMBOL_KEYS = ('kind', 'name', 'description', 'visibility', 'extends', 'implements', 'hasSample',
+               'uxGuidelinesLink', 'uxGuidelinesLinkText')
+METADATA_KEYS = ('stereotype', 'basetype', 'pattern')
+METHOD_KEYS = ('name', 'visibility', 'description')
+PARAMETER_KEYS = ('name', 'description', 'optional', 'depth')
+
+
+def digest_method(json_method: json) -> dict:
+    digested = {key: json_method[key] for key in METHOD_KEYS if key in json_method}
+    if 'parameters' in json_method:
+        digested['parameters'] = [digest_parameter(p) for p in json_method['parameters']]
+    if 'returnValue' in json_method and 'types' in json_method['returnValue']:
+        digested['returnValue'] = {'types': TsType.digest(json_method['returnValue']['types'])}
+    return digested
+
+
+def digest_parameter(json_parameter: json) -> dict:
+    digested = {key: json_parameter[key] for key in PARAMETER_KEYS if key in json_parameter}
+    if 'types' in json_parameter:
+        digested['types'] = TsType.digest(json_parameter['types'])
+    return digested
+
+
+def digest_symbol(json_symbol: json) -> dict:
+    """
+    a compact copy of a json symbol, only containing what `Declaration.load` reads and with all types already parsed.
+    Loading the digested symbol gives the same result as loading the original one.
+    """
+    digested = digest_method(json_symbol)  # functions are loaded like methods
+    digested.update({key: json_symbol[key] for key in SYMBOL_KEYS if key in json_symbol})
+    if 'ui5-metadata' in json_symbol:
+        meta = json_symbol['ui5-metadata']
+        digested['ui5-metadata'] = {key: meta[key] for key in METADATA_KEYS if key in meta}
+    if 'methods' in json_symbol:
+        digested['methods'] = [digest_method(m) for m in json_symbol['methods']]
+    if 'constructor' in json_symbol:
+        digested['constructor'] = digest_method(json_symbol['constructor'])
+    if json_symbol['kind'] == 'enum':
+        for key in ('nodes', 'properties'):
+            if key in json_symbol:
+                digested[key] = [{'name': o['name'], 'description': o.get('description')} for o in json_symbol[key]]
+    return digested
+
+
+def write_if_changed(path: str, content: str) -> bool:
+    """only touches the file if its content changes, so that IDEs do not re-index untouched files"""
+    data = content.encode('utf8')
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return False
+    except FileNotFoundError:
+        pass
+    with open(path, 'wb') as f:
+        f.write(data)
+    return True
+
+
+def init_writer(source_links: bool, symbols: Optional[Container[str]]):
+    """also carries over the module settings, since spawned worker processes (e.g. on windows) start from scratch"""
+    global ENABLE_SOURCE_LINKS_WITH_LINE_NUMBERS, SYMBOLS
+    ENABLE_SOURCE_LINKS_WITH_LINE_NUMBERS = source_links
+    SYMBOLS = symbols
+
+
+def release_writer():
+    """forgets the symbols written with, so that they can be freed (e.g. before building another version)"""
+    global SYMBOLS
+    SYMBOLS = None
+
+
+class WriteResult(NamedTuple):
+    changed: bool
+    size: int  # of the rendered file, in bytes
+    seconds: float  # rendering and writing it
+    descriptions: Tuple[int, int, float]  # the description store counts of rendering it, see `DescriptionStore`
+    marked_up: Dict[str, MarkedUp]  # the descriptions first marked up for it
+
+
+def write_file(directory: str, file_name: str, ns: Namespace) -> WriteResult:
+    start = time.perf_counter()
+    hits, misses, seconds = DESCRIPTIONS.counts()
+    content = ns.render('', file_name[:-len('.d.ts')])
+    changed = write_if_changed(directory + file_name, content)
+    after = DESCRIPTIONS.counts()
+    return WriteResult(changed, len(content.encode('utf8')), time.perf_counter() - start,
+                       (after[0] - hits, after[1] - misses, after[2] - seconds), DESCRIPTIONS.take_added())
+
+
+def file_task(ns: Namespace) -> Tuple[Namespace, Dict[str, MarkedUp], Optional[SourceCache]]:
+    """what a writer process needs to render the file of `ns`, see `write_file_part`"""
+    known = {text: DESCRIPTIONS.marked_up[text] for text in ns.descriptions() if text in DESCRIPTIONS.marked_up}
+    source_cache = SOURCE_CACHE.part(ns.source_files()) if ENABLE_SOURCE_LINKS_WITH_LINE_NUMBERS else None
+    return ns.file_part(), known, source_cache
+
+
+def write_file_part(directory: str, file_name: str, ns: Namespace, descriptions: Dict[str, MarkedUp],
+                    source_cache: Optional[SourceCache]) -> WriteResult:
+    """
+    `write_file` in a writer process, which gets the namespace's `file_part` along with the descriptions of it that
+    were marked up before, and the source files of its classes (if it links to them)
+    """
+    global SOURCE_CACHE
+    DESCRIPTIONS.marked_up.update(descriptions)
+    if source_cache is not None:
+        SOURCE_CACHE = source_cache
+    return write_file(directory, file_name, ns)
+
+
 class Declaration:
-    root_ns: Namespace = Namespace("root")
+    root_ns: Namespace
+    declared: Dict[str, List[Tuple[str, str]]]  # lib -> (full name, kind) of every symbol it declares
+    symbols: Optional[SymbolTable]  # built by `clean_up`
+
+    def __init__(self):
+        self.root_ns = Namespace("root")
+        self.declared = {}
+        self.symbols = None
 
     def load(self, json_data: json, lib_name: str):
-        for json_symbol in json_data['symbols']:
+        self.load_symbols(json_data['symbols'], lib_name)
+
+    def load_symbols(self, json_symbols: Iterable[json], lib_name: str):
+        count = 0
+        for json_symbol in json_symbols:
+            count += 1
             kind = json_symbol['kind']
             name: str = pp_class_name(json_symbol['name'])
             meta = json_symbol.get('ui5-metadata', {})
             if meta.get('stereotype', '') == 'datatype':
                 kind = 'typedef'
+            self.declared.setdefault(lib_name, []).append((name, kind))
+            if kind == 'namespace':
+                self.root_ns.resolve_namespace(name).libs.add(lib_name)
+            elif '.' in name:
+                self.root_ns.resolve_namespace(name.rsplit('.', 1)[0]).libs.add(lib_name)
             if kind == 'namespace':
                 self.root_ns.resolve_namespace(name).load(json_symbol)
             elif kind == 'class':
@@ -523,10 +826,89 @@ class Declaration:
                 self.root_ns.resolve_method(name, json_symbol).visibility = None
             else:
                 print('unknown kind: ' + kind)
+        PROFILE.count('symbols', count)
 
-    def save_to(self, directory: str):
+    def files(self) -> Iterator[Tuple[str, Namespace]]:
+        """(file name, namespace) of every file this declaration consists of"""
         for key in sorted(self.root_ns.namespaces):
-            self.root_ns.namespaces[key].write('', '', directory)
+            for my_name, ns in self.root_ns.namespaces[key].files(''):
+                yield my_name + '.d.ts', ns
 
-    def clean_up(self):
-        self.root_ns.clean_up()
+    def save_to(self, directory: str, jobs: int = 1) -> List[str]:
+        """
+        writes all files, returning the names of those whose content changed.
+        With more than one job, the files are rendered and written by worker processes, biggest files first.
+        Each worker only gets the symbol names, and along with each file only what that file is rendered from
+        (see `write_file_part`): the workers never see the whole model, the whole description store or source cache.
+        The `DESCRIPTIONS` of this process collect what the workers marked up (and their counts),
+        so that later builds in this process can reuse them as well.
+        """
+        with PROFILE.phase('write'):
+            files = dict(self.files())  # if two namespaces are written to the same file, the later one wins
+            if jobs <= 1 or len(files) <= 1:
+                init_writer(ENABLE_SOURCE_LINKS_WITH_LINE_NUMBERS, self.symbols)
+                try:
+                    results = [write_file(directory, file_name, ns) for file_name, ns in files.items()]
+                finally:
+                    release_writer()
+            else:
+                by_size = sorted(files, key=lambda file_name: -files[file_name].size())
+                pool_size = min(jobs, len(files))
+                symbol_names = None if self.symbols is None else self.symbols.names()
+                with ProcessPoolExecutor(max_workers=pool_size, initializer=init_writer,
+                                         initargs=(ENABLE_SOURCE_LINKS_WITH_LINE_NUMBERS, symbol_names)) as pool:
+                    futures = {file_name: pool.submit(write_file_part, directory, file_name,
+                                                      *file_task(files[file_name])) for file_name in by_size}
+                    results = [futures[file_name].result() for file_name in files]
+                for result in results:
+                    DESCRIPTIONS.add_counts(result.descriptions)
+                    DESCRIPTIONS.marked_up.update(result.marked_up)
+            for file_name, result in zip(files, results):
+                PROFILE.time_item('write', file_name, result.seconds)
+                PROFILE.count('files', 1)
+                PROFILE.count('bytes rendered', result.size)
+                if result.changed:
+                    PROFILE.count('files written', 1)
+                    PROFILE.count('bytes written', result.size)
+        return [file_name for file_name, result in zip(files, results) if result.changed]
+
+    def clean_up(self, other_declared: Dict[str, List[Tuple[str, str]]] = None):
+        """
+        builds the symbol table and cleans up all symbols with it.
+        `other_declared` adds the symbols of libraries that were not loaded (see `build_incrementally`)
+        """
+        with PROFILE.phase('clean_up'):
+            self.symbols = SymbolTable({**(other_declared or {}), **self.declared})
+            self.root_ns.clean_up(self.symbols)
+        for name, count in self.counts().items():
+            PROFILE.count(name, count)
+
+    def counts(self) -> Dict[str, int]:
+        """how many of each kind of declaration there are"""
+        counts = {'namespaces': 0, 'classes': 0, 'enums': 0, 'typedefs': 0, 'methods': 0, 'shared types': 0}
+        for ns in self.root_ns.walk():
+            counts['namespaces'] += 1
+            counts['shared types'] += len(ns.shared_types)
+            counts['classes'] += len(ns.classes)
+            counts['enums'] += len(ns.enums)
+            counts['typedefs'] += len(ns.typedefs)
+            counts['methods'] += len(ns.methods) + sum(len(c.methods) for c in ns.classes.values())
+        return counts
+
+    def source_files(self) -> Set[Tuple[str, str]]:
+        """(lib, uri) of every source file that `Method.get_source_line` will look into while writing"""
+        sources = set()
+        for ns in self.root_ns.walk():
+            sources.update(ns.source_files())
+        return sources
+
+    def prefetch_sources(self, jobs: int) -> Optional[Dict[str, int]]:
+        """downloads all needed source files up front, so that writing does not have to wait for the network"""
+        if not ENABLE_SOURCE_LINKS_WITH_LINE_NUMBERS:
+            return None
+        with PROFILE.phase('sources'):
+            counts = SOURCE_CACHE.prefetch(self.source_files(), jobs)
+            SOURCE_CACHE.save()
+        for name, count in counts.items():
+            PROFILE.count('sources ' + name, count)
+        return counts
@@ -1,212 +1,503 @@
 from abc import abstractmethod
+from functools import lru_cache
 from typing import *
 import re
 from .util_functions import *
 
 
 OBJ_MAP = re.compile(r"Object\.<(.+),(.+)>")
+TOKEN = re.compile(r"""\s*(?:(/\*.*?\*/)|([\w$.]+|\*)|("[^"]*"|'[^']*')|(\[\]|[<>(){},:|?]))""")
+
+# ui5 type names that have a different name in typescript
+TYPE_NAMES = {
+    'jQuery': 'JQuery',
+    'function': 'Function',
+    'int': 'number/*int*/',
+    'sap.ui.core.int': 'number/*int*/',
+    'Infinity': 'number/*infinity*/',
+    'int[]': 'number[]/*int[]*/',
+    'float': 'number',
+    'float[]': 'number[]',
+    'double': 'number',
+    'double[]': 'number[]',
+    'real': 'number',
+    'real[]': 'number[]',
+    'date': 'Date',
+    '*': 'any',
+}
+# same, but matched case-insensitively (the keys are lowercase)
+LOWERCASE_TYPE_NAMES = {
+    'array': 'any[]',
+    'map': 'Map<any, any>',
+    'promise': 'Promise<any>',
+    'iterator': 'Iterator<any>',
+}
+GENERIC_PREFIXES = [
+    # "Array.<" can only happen if we are combined with a different type, and the ui5 api json
+    # sadly splits this multi-type-array at this inner "|"
+    # see: Input::getSuggestionRows
+    ("Array.<", "Array<"),
+    ("Promise.<", "Promise<"),
+]
+TYPE_CACHE_SIZE = 1 << 14
 
 
 class TsType:
+    """
+    a node of a parsed type. Nodes are immutable and shared (see `parse_type`),
+    so all operations return new nodes instead of changing this one, and the rendered text can be cached.
+    """
+    __slots__ = ('rendered',)
+    rendered: Optional[str]
 
-    # Awesome un-symmetric double-dispatch:
-    # The un-symmetry is maintained via "combine" vs "combined"
-    # (So that the order of the result stays predictable)
+    def __init__(self):
+        self.rendered = None
 
     @abstractmethod
-    def combine_with(self, other: 'TsType') -> 'CombinedType':
+    def key(self) -> tuple:
+        """what makes two nodes of the same class equal"""
         pass
 
-    @abstractmethod
-    def combined_with(self, other: 'TsType') -> 'CombinedType':
-        pass
+    def __eq__(self, other):
+        return self is other or (type(self) is type(other) and self.key() == other.key())
 
-    @abstractmethod
-    def combine_with_literal(self, other: 'TypeLiteral') -> 'CombinedType':
-        pass
+    def __hash__(self):
+        return hash((type(self).__name__, self.key()))
 
     @abstractmethod
-    def combined_with_literal(self, other: 'TypeLiteral') -> 'CombinedType':
+    def render(self) -> str:
         pass
 
-    @abstractmethod
-    def combine_with_combined(self, other: 'CombinedType') -> 'CombinedType':
-        pass
+    def written(self) -> str:
+        if self.rendered is None:
+            self.rendered = self.render()
+        return self.rendered
 
-    @abstractmethod
-    def combined_with_combined(self, other: 'CombinedType') -> 'CombinedType':
-        pass
+    def union_options(self) -> List['TsType']:
+        return [self]
 
-    @abstractmethod
-    def trim_by(self, base_uri: str):
-        pass
+    def combine_with(self, other: 'TsType') -> 'CombinedType':
+        return CombinedType([*self.union_options(), *other.union_options()])
 
-    @abstractmethod
-    def written(self) -> str:
-        pass
+    def trim_by(self, base_uri: str, symbols: 'SymbolTable') -> 'TsType':
+        return self
 
-    @abstractmethod
-    def contains_plain_object(self):
-        pass
+    def contains_plain_object(self) -> bool:
+        return False
 
-    @abstractmethod
     def replace_plain_object_with(self, fancy_object: 'TsType') -> 'TsType':
-        pass
+        raise Exception("I do not contain a plain Object!")
 
     @staticmethod
     def parse_single(type: str):
-        return TypeLiteral(TsType.parse_type_name({"name": type}))
+        return parse_type(TsType.parse_type_name({"name": type}))
 
     @staticmethod
-    def parse(json_types: List) -> 'TsType':
-        if len(json_types) == 1:
-            return TypeLiteral(TsType.parse_type_name(json_types[0]))
-        else:
-            return CombinedType([TypeLiteral(TsType.parse_type_name(t)) for t in json_types])
+    def parse(json_types: Sequence) -> 'TsType':
+        if type(json_types) is tuple:
+            return parse_type_names(json_types)  # already extracted by `digest`
+        return parse_type_names(tuple(TsType.parse_type_name(t) for t in json_types))
+
+    @staticmethod
+    def digest(json_types: List) -> Tuple[str, ...]:
+        """extracts the names up front (e.g. in a worker process), `parse` accepts the result instead of the json types"""
+        return tuple(TsType.parse_type_name(t) for t in json_types)
 
     @staticmethod
-    def parse_type_name(json_type):
-        name = ''
+    def parse_type_name(json_type) -> str:
+        if isinstance(json_type, str):
+            return json_type  # already extracted by `digest`
         if 'name' in json_type:
-            name = json_type['name']
+            return pp_type(json_type['name'])
         elif 'value' in json_type:
-            name = json_type['value']
+            return pp_type(json_type['value'])
         else:
             raise Exception("cannot get type name!")
-        name = pp_type(name)
-        if name == 'jQuery':
-            name = 'JQuery'
-        if name == 'function':
-            name = 'Function'
-        if name == 'int' or name == 'sap.ui.core.int':
-            name = 'number/*int*/'
-        if name == 'Infinity':
-            name = 'number/*infinity*/'
-        if name == 'int[]':
-            name = 'number[]/*int[]*/'
-        if name == 'float':
-            name = 'number'
-        if name == 'float[]':
-            name = 'number[]'
-        if name == 'double':
-            name = 'number'
-        if name == 'double[]':
-            name = 'number[]'
-        if name == 'real':
-            name = 'number'
-        if name == 'real[]':
-            name = 'number[]'
-        if name == 'date':
-            name = 'Date'
-        if name.lower() == 'array':
-            name = 'any[]'
-        if name.lower() == 'map':
-            name = 'Map<any, any>'
-        if name.lower() == 'promise':
-            name = 'Promise<any>'
-        if name.lower() == 'iterator':
-            name = 'Iterator<any>'
-        if name == '*':
-            name = 'any'
-        if name.startswith("Array.<"):  # this is really bad!
-            # this can only happen if we are combined with a different type, and the ui5 api json
-            # sadly splits this multi-type-array at this inner "|"
-            # see: Input::getSuggestionRows
-            name = "Array<" + name[len("Array.<"):]
-        if name.startswith("Promise.<"):
-            name = "Promise<" + name[len("Promise.<"):]
-        name = OBJ_MAP.sub(r'Map<\1,\2>', name)
-        name = name.replace("function()", "Function")
-        return name
 
 
 class TypeLiteral(TsType):
+    """a plain type name, or the text of a type that could not be parsed"""
+    __slots__ = ('name',)
     name: str
 
     def __init__(self, name: str):
-        self.name = name
+        super().__init__()
+        self.name = intern(name)
 
-    def combine_with(self, other: 'TsType') -> 'CombinedType':
-        return other.combined_with_literal(self)
+    @staticmethod
+    @lru_cache(maxsize=TYPE_CACHE_SIZE)
+    def of(name: str) -> 'TypeLiteral':
+        return TypeLiteral(name)
 
-    def combined_with(self, other: 'TsType') -> 'CombinedType':
-        return other.combine_with_literal(self)
+    def key(self) -> tuple:
+        return self.name,
 
-    def combine_with_literal(self, other: 'TypeLiteral') -> 'CombinedType':
-        return CombinedType([self, other])
+    def render(self) -> str:
+        return self.name
 
-    def combined_with_literal(self, other: 'TypeLiteral') -> 'CombinedType':
-        return CombinedType([other, self])
+    def trim_by(self, base_uri: str, symbols: 'SymbolTable') -> 'TsType':
+        if self.name.startswith('{'):
+            return self
+        name = symbols.qualify(self.name, base_uri)
+        # actually shortining the type intoduces more ambiguity errors, so names always stay fully qualified
+        return self if name == self.name else TypeLiteral.of(name)
 
-    def combine_with_combined(self, other: 'CombinedType') -> 'CombinedType':
-        return other.combined_with_literal(self)
+    def contains_plain_object(self) -> bool:
+        return self.name == 'object'
 
-    def combined_with_combined(self, other: 'CombinedType') -> 'CombinedType':
-        return other.combine_with_literal(self)
+    def replace_plain_object_with(self, fancy_object: 'TsType') -> 'TsType':
+        return fancy_object
 
-    def trim_by(self, base_uri: str):
-        if self.name.startswith('{'):
-            return
-        base_parts = base_uri.split('.')
-        self_parts = self.name.split('.')
-        global_constant_clash = self.name == 'Element'
-        different_package = self_parts[0] != base_parts[0] and len(self_parts) > 1
-        if global_constant_clash or different_package:
-            self.name = 'globalThis.' + self.name
-            return
-        # actually shortining the type intoduces more ambiguity errors
-        # while len(base_parts) > 0 and len(self_parts) > 1 and base_parts[0] == self_parts[0]:
-        #     base_parts.pop(0)
-        #     self_parts.pop(0)
-        # self.name = '.'.join(self_parts)
 
-    def written(self) -> str:
-        return self.name
+PLAIN_OBJECT = TypeLiteral.of('object')
 
-    def contains_plain_object(self):
-        return self.written() == 'object'
 
-    def replace_plain_object_with(self, fancy_object: 'TsType') -> 'TsType':
-        return fancy_object
+def trim_all(types: Sequence[TsType], base_uri: str, symbols: 'SymbolTable') -> Optional[List[TsType]]:
+    """the trimmed types, or None if trimming did not change any of them"""
+    trimmed = [t.trim_by(base_uri, symbols) for t in types]
+    if all(new is old for new, old in zip(trimmed, types)):
+        return None
+    return trimmed
 
 
 class CombinedType(TsType):
+    """a union of types, written with each distinct option once"""
+    __slots__ = ('options',)
     options: List[TsType]
 
-    def __init__(self, options):
+    def __init__(self, options: List[TsType]):
+        super().__init__()
         self.options = options or []
 
-    def combine_with(self, other: 'TsType') -> 'CombinedType':
-        return other.combined_with_combined(self)
+    def key(self) -> tuple:
+        return tuple(self.options)
+
+    def render(self) -> str:
+        return '(' + " | ".join([o.written() for o in dict.fromkeys(self.options)]) + ")"
 
-    def combined_with(self, other: 'TsType') -> 'CombinedType':
-        return other.combine_with_combined(self)
+    def union_options(self) -> List[TsType]:
+        return self.options
 
-    def combine_with_literal(self, other: 'TypeLiteral') -> 'CombinedType':
-        return CombinedType([*self.options, other])
+    def trim_by(self, base_uri: str, symbols: 'SymbolTable') -> 'TsType':
+        options = trim_all(self.options, base_uri, symbols)
+        return self if options is None else CombinedType(options)
 
-    def combined_with_literal(self, other: 'TypeLiteral') -> 'CombinedType':
-        return CombinedType([other, *self.options])
+    def contains_plain_object(self) -> bool:
+        return PLAIN_OBJECT in self.options
 
-    def combine_with_combined(self, other: 'CombinedType') -> 'CombinedType':
-        return CombinedType([*self.options, *other.options])
+    def replace_plain_object_with(self, fancy_object: 'TsType') -> 'TsType':
+        i = self.options.index(PLAIN_OBJECT)
+        return CombinedType([*self.options[:i], fancy_object, *self.options[i + 1:]])
+
+
+class ArrayType(TsType):
+    __slots__ = ('element',)
+    element: TsType
+
+    def __init__(self, element: TsType):
+        super().__init__()
+        self.element = element
+
+    def key(self) -> tuple:
+        return self.element,
+
+    def render(self) -> str:
+        return self.element.written() + '[]'
+
+    def trim_by(self, base_uri: str, symbols: 'SymbolTable') -> 'TsType':
+        element = self.element.trim_by(base_uri, symbols)
+        return self if element is self.element else ArrayType(element)
 
-    def combined_with_combined(self, other: 'CombinedType') -> 'CombinedType':
-        return CombinedType([*other.options, *self.options])
 
-    def trim_by(self, base_uri: str):
-        for option in self.options:
-            option.trim_by(base_uri)
+class GenericType(TsType):
+    """a generic type with its type arguments, like Promise<string>"""
+    __slots__ = ('base', 'arguments')
+    base: TsType
+    arguments: List[TsType]
 
-    def written(self) -> str:
-        return '(' + " | ".join([o.written() for o in self.options]) + ")"
+    def __init__(self, base: TsType, arguments: List[TsType]):
+        super().__init__()
+        self.base = base
+        self.arguments = arguments
 
-    def contains_plain_object(self):
-        return any([option.written() == 'object' for option in self.options])
+    def key(self) -> tuple:
+        return self.base, tuple(self.arguments)
 
-    def replace_plain_object_with(self, fancy_object: 'TsType') -> 'TsType':
-        for i, option in enumerate(self.options):
-            if option.contains_plain_object():
-                self.options[i] = option.replace_plain_object_with(fancy_object)
-                return self
-        raise Exception("I do not contain a plain Object!")
+    def render(self) -> str:
+        return self.base.written() + '<' + ', '.join([a.written() for a in self.arguments]) + '>'
+
+    def trim_by(self, base_uri: str, symbols: 'SymbolTable') -> 'TsType':
+        base = self.base.trim_by(base_uri, symbols)
+        arguments = trim_all(self.arguments, base_uri, symbols)
+        if base is self.base and arguments is None:
+            return self
+        return GenericType(base, arguments or self.arguments)
+
+
+class FunctionType(TsType):
+    """a function signature like `function(string, int): boolean`, written as an arrow function type"""
+    __slots__ = ('parameters', 'return_type')
+    parameters: List[TsType]
+    return_type: Optional[TsType]
+
+    def __init__(self, parameters: List[TsType], return_type: Optional[TsType]):
+        super().__init__()
+        self.parameters = parameters
+        self.return_type = return_type
+
+    def key(self) -> tuple:
+        return tuple(self.parameters), self.return_type
+
+    def render(self) -> str:
+        parameters = ', '.join(['p' + str(i) + ': ' + p.written() for i, p in enumerate(self.parameters)])
+        return_type = 'any' if self.return_type is None else self.return_type.written()
+        return '((' + parameters + ') => ' + return_type + ')'
+
+    def trim_by(self, base_uri: str, symbols: 'SymbolTable') -> 'TsType':
+        parameters = trim_all(self.parameters, base_uri, symbols)
+        return_type = None if self.return_type is None else self.return_type.trim_by(base_uri, symbols)
+        if parameters is None and return_type is self.return_type:
+            return self
+        return FunctionType(parameters or self.parameters, return_type)
+
+
+class ObjectType(TsType):
+    """an object literal type, made of (name, optional, type) fields - the type of a field may be unknown"""
+    __slots__ = ('fields',)
+    fields: List[Tuple[str, bool, Optional[TsType]]]
+
+    def __init__(self, fields: List[Tuple[str, bool, Optional[TsType]]]):
+        super().__init__()
+        self.fields = fields
+
+    def key(self) -> tuple:
+        return tuple(self.fields)
+
+    def render(self) -> str:
+        written = []
+        for name, optional, field_type in self.fields:
+            if optional:
+                name += '?'
+            if field_type is not None:
+                name += ': ' + field_type.written()
+            written.append(name)
+        return '{' + ', '.join(written) + '}'
+
+    def trim_by(self, base_uri: str, symbols: 'SymbolTable') -> 'TsType':
+        fields = [(name, optional, None if t is None else t.trim_by(base_uri, symbols))
+                  for name, optional, t in self.fields]
+        if all(new[2] is old[2] for new, old in zip(fields, self.fields)):
+            return self
+        return ObjectType(fields)
+
+
+class CommentedType(TsType):
+    """a type followed by a comment, like number/*int*/"""
+    __slots__ = ('type', 'comment')
+    type: TsType
+    comment: str
+
+    def __init__(self, type: TsType, comment: str):
+        super().__init__()
+        self.type = type
+        self.comment = comment
+
+    def key(self) -> tuple:
+        return self.type, self.comment
+
+    def render(self) -> str:
+        return self.type.written() + '/*' + self.comment + '*/'
+
+    def trim_by(self, base_uri: str, symbols: 'SymbolTable') -> 'TsType':
+        trimmed = self.type.trim_by(base_uri, symbols)
+        return self if trimmed is self.type else CommentedType(trimmed, self.comment)
+
+
+class TypeSyntaxError(ValueError):
+    pass
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = TOKEN.match(text, position)
+        if match is None:
+            raise TypeSyntaxError("Unexpected '" + text[position:] + "' in type " + text)
+        tokens.append(match.group(match.lastindex))
+        position = match.end()
+    return tokens
+
+
+class TypeParser:
+    """
+    a recursive descent parser for ui5 type names, in a single pass over the tokens:
+    type := option ('|' option)*
+    option := primary ('[]' | comment)*
+    primary := '(' type ')' | '{' fields '}' | 'function' '(' types ')' (':' option)? | name ('<' types '>')?
+    """
+    tokens: List[str]
+    position: int
+
+    def __init__(self, text: str):
+        self.tokens = tokenize(text)
+        self.position = 0
+
+    def peek(self) -> str:
+        return self.tokens[self.position] if self.position < len(self.tokens) else ''
+
+    def next(self) -> str:
+        token = self.peek()
+        if token == '':
+            raise TypeSyntaxError("Unexpected end of type")
+        self.position += 1
+        return token
+
+    def expect(self, token: str):
+        if self.next() != token:
+            raise TypeSyntaxError("Expected '" + token + "' in type")
+
+    def parse(self) -> TsType:
+        result = self.type()
+        if self.position < len(self.tokens):
+            raise TypeSyntaxError("Unexpected '" + self.peek() + "' in type")
+        return result
+
+    def type(self) -> TsType:
+        options = [self.option()]
+        while self.peek() == '|':
+            self.next()
+            options.append(self.option())
+        return options[0] if len(options) == 1 else CombinedType(options)
+
+    def types_until(self, end: str) -> List[TsType]:
+        result = []
+        while self.peek() != end:
+            if len(result) > 0:
+                self.expect(',')
+            result.append(self.type())
+        self.next()
+        return result
+
+    def option(self) -> TsType:
+        result = self.primary()
+        while True:
+            if self.peek() == '[]':
+                self.next()
+                result = ArrayType(result)
+            elif self.peek().startswith('/*'):
+                result = CommentedType(result, self.next()[2:-2])
+            else:
+                return result
+
+    def primary(self) -> TsType:
+        token = self.next()
+        if token == '(':
+            result = self.type()
+            self.expect(')')
+            return result
+        if token == '{':
+            return self.object_literal()
+        if token == 'function' and self.peek() == '(':
+            self.next()
+            parameters = self.types_until(')')
+            return_type = None
+            if self.peek() == ':':
+                self.next()
+                return_type = self.option()
+            if len(parameters) == 0 and return_type is None:
+                return parse_type('Function')
+            return FunctionType(parameters, return_type)
+        if token[0] in '"\'' or token == '*' or re.match(r'[\w$]', token):
+            if self.peek() != '<':
+                return self.name(token)
+            self.next()
+            base = token.rstrip('.')  # ui5 writes generics like Array.<string>
+            arguments = self.types_until('>')
+            if base == 'Object' and len(arguments) == 2:
+                base = 'Map'
+            return GenericType(TypeLiteral.of(base), arguments)
+        raise TypeSyntaxError("Unexpected '" + token + "' in type")
+
+    def name(self, name: str) -> TsType:
+        if name in TYPE_NAMES:
+            return parse_type(TYPE_NAMES[name])
+        if name.lower() in LOWERCASE_TYPE_NAMES:
+            return parse_type(LOWERCASE_TYPE_NAMES[name.lower()])
+        return TypeLiteral.of(name)
+
+    def object_literal(self) -> TsType:
+        fields = []
+        while self.peek() != '}':
+            if len(fields) > 0:
+                self.expect(',')
+            name = self.next()
+            optional = self.peek() == '?'
+            if optional:
+                self.next()
+            field_type = None
+            if self.peek() == ':':
+                self.next()
+                field_type = self.type()
+            fields.append((name, optional, field_type))
+        self.next()
+        return ObjectType(fields)
+
+
+@lru_cache(maxsize=TYPE_CACHE_SIZE)
+def try_parse_type(name: str) -> Optional[TsType]:
+    """the parsed type for a ui5 type name, or None if it is not a valid type"""
+    try:
+        return TypeParser(name).parse()
+    except TypeSyntaxError:
+        return None
+
+
+@lru_cache(maxsize=TYPE_CACHE_SIZE)
+def parse_type_names(names: Tuple[str, ...]) -> TsType:
+    """
+    the parsed type for the type names of a parameter or return value. Like single names, the same combinations come up
+    again and again - in one version of the api, and even more so in several versions built by the same run.
+    """
+    if len(names) == 1:
+        return parse_type(names[0])
+    if any(try_parse_type(name) is None for name in names):
+        # the ui5 api json splits multi-type arrays at their inner "|", e.g. ['Array.<string', 'int>'],
+        # so try whether the parts make sense together
+        joined = try_parse_type('|'.join(names))
+        if joined is not None:
+            return joined
+    return CombinedType([parse_type(name) for name in names])
+
+
+@lru_cache(maxsize=TYPE_CACHE_SIZE)
+def parse_type(name: str) -> TsType:
+    """
+    the parsed type for a ui5 type name. The same few names come up thousands of times, and the parsed types are
+    immutable, so the result is cached and shared.
+    Names that cannot be parsed keep their (normalized) text, see `normalize_type_name`.
+    """
+    if name in TYPE_NAMES:
+        name = TYPE_NAMES[name]
+    elif name.lower() in LOWERCASE_TYPE_NAMES:
+        name = LOWERCASE_TYPE_NAMES[name.lower()]
+    result = try_parse_type(name)
+    if result is None:
+        result = TypeLiteral.of(normalize_type_name(name))
+    return result
+
+
+def normalize_type_name(name: str) -> str:
+    """the best effort typescript text of a ui5 type name that cannot be parsed"""
+    name = pp_type(name)
+    if name in TYPE_NAMES:
+        return TYPE_NAMES[name]
+    if name.lower() in LOWERCASE_TYPE_NAMES:
+        return LOWERCASE_TYPE_NAMES[name.lower()]
+    for prefix, replacement in GENERIC_PREFIXES:
+        if name.startswith(prefix):
+            name = replacement + name[len(prefix):]
+    name = OBJ_MAP.sub(r'Map<\1,\2>', name)
+    name = name.replace("function()", "Function")
+    return name
@@ -1,3 +1,7 @@
+import sys
+from typing import *
+
+
 forbidden_words = ['with', 'as']
 forbidden_chars = [' ', ':', '/', '-', '<', '>', '{', '}', '[', ']']
 
@@ -34,5 +38,10 @@ def pp_name(name: str) -> str:
     return name
 
 
+def intern(value: Optional[str]) -> Optional[str]:
+    """shares one copy of strings that repeat a lot throughout the model, like lib names, uris and type names"""
+    return sys.intern(value) if value is not None else None
+
+
 def capitalize_first(data: str) -> str:
     return data[0].capitalize() + data[1:]
@@ -0,0 +1,77 @@
+import os
+import time
+from typing import *
+
+from .api_store import api_suffix
+
+
+DEFAULT_INTERVAL = 0.5  # seconds between two looks at the api directory
+DEFAULT_DEBOUNCE = 0.3  # seconds the api files have to stay unchanged before rebuilding
+
+
+def scan(api_directory: str) -> Dict[str, Tuple[int, int]]:
+    """file name -> (modification time, size) of every api file"""
+    stamps = {}
+    with os.scandir(api_directory) as entries:
+        for entry in entries:
+            if entry.is_file() and api_suffix(entry.name) is not None:
+                stat = entry.stat()
+                stamps[entry.name] = (stat.st_mtime_ns, stat.st_size)
+    return stamps
+
+
+def changed_files(old: Dict[str, Tuple[int, int]], new: Dict[str, Tuple[int, int]]) -> List[str]:
+    return sorted(name for name in old.keys() | new.keys() if old.get(name) != new.get(name))
+
+
+class Watcher:
+    """
+    polls the api directory and calls `rebuild` whenever api files were changed, added or removed,
+    once they stopped changing for a moment (a download writes one library after the other).
+    Polling instead of inotify & co. needs no extra dependency, and a few dozen stat calls are cheap.
+    """
+    api_directory: str
+    rebuild: Callable[[List[str]], None]  # gets the names of the changed files
+    interval: float
+    debounce: float
+    stamps: Dict[str, Tuple[int, int]]
+
+    def __init__(self, api_directory: str, rebuild: Callable[[List[str]], None],
+                 interval: float = DEFAULT_INTERVAL, debounce: float = DEFAULT_DEBOUNCE):
+        self.api_directory = api_directory
+        self.rebuild = rebuild
+        self.interval = interval
+        self.debounce = debounce
+        self.stamps = scan(api_directory)
+
+    def wait_for_changes(self) -> List[str]:
+        while True:
+            time.sleep(self.interval)
+            stamps = scan(self.api_directory)
+            if stamps == self.stamps:
+                continue
+            while True:
+                time.sleep(self.debounce)
+                settled = scan(self.api_directory)
+                if settled == stamps:
+                    break
+                stamps = settled
+            changed = changed_files(self.stamps, stamps)
+            self.stamps = stamps
+            return changed
+
+    def run(self):
+        print("Watching " + self.api_directory + " for changes, press Ctrl+C to stop")
+        try:
+            while True:
+                changed = self.wait_for_changes()
+                print("\nChanged: " + ", ".join(changed))
+                start = time.perf_counter()
+                try:
+                    self.rebuild(changed)
+                except Exception as e:  # e.g. an api file that is still being written, keep watching
+                    print("\nCannot rebuild: " + repr(e))
+                    continue
+                print("Rebuilt in %.2fs" % (time.perf_counter() - start))
+        except KeyboardInterrupt:
+            print("\nStopped watching")